@@ -0,0 +1,14 @@
+from dataclasses import dataclass
+from typing import Optional
+
+@dataclass
+class SearchRow:
+    """搜索记录表格的一行 - 保存原始关键词列表，不必再从显示文本中解析"""
+    include_keywords: list[str]   # 包含关键词
+    exclude_keywords: list[str]   # 排除关键词
+    hits: int                     # 匹配数量
+    pattern: str = ""             # 表达式列显示的文本
+    description: str = ""         # 描述列显示的文本
+    checked: bool = True          # 是否勾选
+    is_regex: bool = False        # 关键词是否为正则表达式
+    cached_pattern: Optional[str] = None  # 勾选时的表达式文本，关键词不变就只格式化一次
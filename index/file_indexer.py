@@ -6,6 +6,9 @@ import time
 import re
 import queue
 import psutil
+from array import array
+from itertools import accumulate, count
+from operator import add
 from typing import Optional, List, Tuple, Dict, Set
 from dataclasses import dataclass
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QVBoxLayout, QWidget, 
@@ -23,7 +26,7 @@ class FileIndexer(QThread):
     """文件索引器 - 在后台建立行索引"""
     
     indexing_progress = pyqtSignal(int, int)  # 当前行数, 文件大小
-    indexing_finished = pyqtSignal(list)      # 行偏移量列表
+    indexing_finished = pyqtSignal(object)    # 行偏移量数组 array('q')
     indexing_error = pyqtSignal(str)          # 错误信息
     
     def __init__(self, file_path: str):
@@ -34,7 +37,7 @@ class FileIndexer(QThread):
     def run(self):
         """建立文件的行索引 - 记录每行在文件中的字节偏移量"""
         try:
-            line_offsets = [0]  # 第一行从偏移量0开始
+            line_offsets = array('q', [0])  # 第一行从偏移量0开始
             
             with open(self.file_path, 'rb') as file:
                 file_size = os.path.getsize(self.file_path)
@@ -45,22 +48,20 @@ class FileIndexer(QThread):
                     chunk = file.read(chunk_size)
                     if not chunk:
                         break
-                        
-                    # 在当前块中查找所有换行符
-                    start_pos = 0
-                    while True:
-                        newline_pos = chunk.find(b'\n', start_pos)
-                        if newline_pos == -1:
-                            break
-                        # 记录下一行的起始偏移量
-                        line_offsets.append(current_pos + newline_pos + 1)
-                        start_pos = newline_pos + 1
                     
-                    current_pos += len(chunk)
+                    # 换行符查找交给C层的split完成：第i个换行符之后的偏移量
+                    # = 块起点 + 前i段长度之和 + i，全程不在Python层逐行循环
+                    pieces = chunk.split(b'\n')
+                    pieces.pop()  # 最后一段后面没有换行符
+                    line_offsets.extend(map(add, accumulate(map(len, pieces)),
+                                            count(current_pos + 1)))
                     
-                    # 定期发送进度更新（每10000行）
-                    if len(line_offsets) % 10000 == 0:
-                        self.indexing_progress.emit(len(line_offsets), file_size)
+                    current_pos += len(chunk)
+                    self.indexing_progress.emit(len(line_offsets), file_size)
+                
+                # 最后一行没有换行符结尾时补上文件末尾，否则这一行不会被计入
+                if line_offsets[-1] < current_pos:
+                    line_offsets.append(current_pos)
                 
                 if not self.should_stop:
                     self.indexing_finished.emit(line_offsets)
@@ -1,11 +1,152 @@
 import os
 import re
 from PyQt5.QtWidgets import QFileDialog
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
 from widgets.code_editor import TextDisplay
 from logic.para_loading import ParaLoadFile
 
 import time
 
+
+def filter_lines(lines, includes, excludes, ignore_case=False, whole_word=False):
+    """
+    过滤行函数 - 修复逻辑确保包含所有include关键词
+    """
+    # 关键词预处理和正则编译只做一次，而不是每行重复
+    processed_includes = [kw.lower() if ignore_case else kw for kw in includes]
+    processed_excludes = [kw.lower() if ignore_case else kw for kw in excludes]
+    
+    if whole_word:
+        include_patterns = [re.compile(r'\b' + re.escape(kw) + r'\b') for kw in processed_includes]
+        # 任一排除词匹配即排除，合并为一个交替模式只需扫描一次
+        exclude_pattern = None
+        if processed_excludes:
+            exclude_pattern = re.compile(
+                r'\b(?:' + '|'.join(map(re.escape, processed_excludes)) + r')\b')
+    
+    for line in lines:
+        # 根据ignore_alpha参数决定是否忽略大小写
+        search_line = line.lower() if ignore_case else line
+        
+        # 处理包含关键词 - 必须包含所有关键词
+        if includes:
+            if whole_word:
+                # 全词匹配模式
+                if not all(pattern.search(search_line) for pattern in include_patterns):
+                    continue
+            else:
+                # 普通包含匹配 - 必须包含所有关键词
+                if not all(kw in search_line for kw in processed_includes):
+                    continue
+        
+        # 处理排除关键词 - 不能包含任何排除关键词
+        if excludes:
+            if whole_word:
+                # 全词匹配模式
+                if exclude_pattern.search(search_line):
+                    continue
+            else:
+                # 普通包含匹配
+                if any(kw in search_line for kw in processed_excludes):
+                    continue
+        
+        yield line
+
+
+class ExportSignals(QObject):
+    """导出任务的信号（QRunnable本身不能发信号）"""
+    
+    finished = pyqtSignal(int, str, str)  # 匹配行数, info文件路径, 结果文件路径
+    error = pyqtSignal(str)               # 错误信息
+
+
+class ExportJob(QRunnable):
+    """导出任务 - 在线程池中过滤全文并写出info和结果文件"""
+    
+    def __init__(self, editor: TextDisplay, include_keywords: list[str], exclude_keywords: list[str],
+                 show_only: bool, ignore_alpha: bool, whole_pair: bool,
+                 patterns_info: str, info_path: str, result_path: str):
+        super().__init__()
+        self.signals = ExportSignals()
+        self.editor = editor
+        self.include_keywords = include_keywords
+        self.exclude_keywords = exclude_keywords
+        self.show_only = show_only
+        self.ignore_alpha = ignore_alpha
+        self.whole_pair = whole_pair
+        self.patterns_info = patterns_info
+        self.info_path = info_path
+        self.result_path = result_path
+    
+    def run(self):
+        include_keywords = self.include_keywords
+        exclude_keywords = self.exclude_keywords
+        
+        # 直接从编辑器已映射的文件和行索引逐行读取，过滤结果边生成边写出，不在内存中保留结果行列表
+        try:
+            # 与原先整文件读取及搜索引擎一致，按utf-8解码并忽略无法解码的字节；
+            # 不使用显示用的检测编码，避免检测误判（如把中文utf-8判成latin1）导出乱码
+            lines = self.editor.iter_lines(encoding='utf-8', errors='ignore')
+            filtered_lines = filter_lines(lines, include_keywords, exclude_keywords, 
+                                          ignore_case=self.ignore_alpha, whole_word=self.whole_pair)
+            # 保存过滤结果 - 仅包含结果行（先写结果文件，才能在info中记录匹配行数）
+            with open(self.result_path, 'wb', buffering=1 << 20) as f:
+                match_count = self._write_lines(f, filtered_lines)
+        except OSError as e:
+            print(f"保存过滤结果失败: {e}")
+            self.signals.error.emit(f"保存过滤结果失败: {e}")
+            return
+        except Exception as e:
+            print(f"读取文件内容失败: {e}")
+            self.signals.error.emit(f"读取文件内容失败: {e}")
+            return
+
+        try:
+            # 保存过滤条件和pattern信息到info文件
+            with open(self.info_path, 'w', encoding='utf-8') as f:
+                f.write("【过滤条件】\n")
+                f.write(f"包含关键词: {include_keywords if include_keywords else '无'}\n")
+                f.write(f"排除关键词: {exclude_keywords if exclude_keywords else '无'}\n")
+                f.write(f"忽略大小写: {'是' if self.ignore_alpha else '否'}\n")
+                f.write(f"全词匹配: {'是' if self.whole_pair else '否'}\n")
+                f.write(f"仅显示匹配行: {'是' if self.show_only else '否'}\n")
+                f.write(f"匹配结果总数: {match_count} 行\n")
+                f.write(f"原文件总行数: {self.editor.total_lines} 行\n\n")
+                
+                f.write("【搜索模式详情】\n")
+                f.write(self.patterns_info)
+        except OSError as e:
+            print(f"保存过滤结果失败: {e}")
+            self.signals.error.emit(f"保存过滤结果失败: {e}")
+            return
+
+        print(f"过滤条件已保存到: {self.info_path}")
+        print(f"过滤结果已保存到: {self.result_path}")
+        print(f"共找到 {match_count} 行匹配结果")
+        self.signals.finished.emit(match_count, self.info_path, self.result_path)
+
+    @staticmethod
+    def _write_lines(f, lines, chunk_bytes: int = 64 * 1024) -> int:
+        """把行攒成约64KB的块拼接后一次编码写出，返回写出的行数"""
+        count = 0
+        chunk = []
+        size = 0
+        for line in lines:
+            chunk.append(line)
+            size += len(line) + 1
+            if size >= chunk_bytes:
+                count += len(chunk)
+                chunk.append('')
+                f.write('\n'.join(chunk).encode('utf-8'))
+                chunk = []
+                size = 0
+        if chunk:
+            count += len(chunk)
+            chunk.append('')
+            f.write('\n'.join(chunk).encode('utf-8'))
+        return count
+
+
 class FileHandler:
     def load_file(self, filepath: str, num_chunks: int=16) -> str | None:
         
@@ -28,74 +169,25 @@ class FileHandler:
                              show_only: bool,
                              ignore_alpha: bool,
                              whole_pair: bool,
-                             tab_name: str):
-
-        def filter_lines(lines, includes, excludes, ignore_case=False, whole_word=False):
-            """
-            过滤行函数 - 修复逻辑确保包含所有include关键词
-            """
-            for line in lines:
-                # 根据ignore_alpha参数决定是否忽略大小写
-                search_line = line.lower() if ignore_case else line
-                
-                # 处理包含关键词 - 必须包含所有关键词
-                if includes:
-                    processed_includes = [kw.lower() if ignore_case else kw for kw in includes]
-                    
-                    if whole_word:
-                        # 全词匹配模式
-                        if not all(re.search(r'\b' + re.escape(kw) + r'\b', search_line) for kw in processed_includes):
-                            continue
-                    else:
-                        # 普通包含匹配 - 必须包含所有关键词
-                        if not all(kw in search_line for kw in processed_includes):
-                            continue
-                
-                # 处理排除关键词 - 不能包含任何排除关键词
-                if excludes:
-                    processed_excludes = [kw.lower() if ignore_case else kw for kw in excludes]
-                    
-                    if whole_word:
-                        # 全词匹配模式
-                        if any(re.search(r'\b' + re.escape(kw) + r'\b', search_line) for kw in processed_excludes):
-                            continue
-                    else:
-                        # 普通包含匹配
-                        if any(kw in search_line for kw in processed_excludes):
-                            continue
-                
-                yield line
+                             tab_name: str) -> 'ExportSignals | None':
+        """
+        导出过滤结果
 
+        先在界面线程选择保存位置，过滤和写文件放到线程池中执行，不阻塞界面；
+        返回的信号对象在导出完成或出错时发出通知，用户取消时返回None
+        """
         name, _ = os.path.splitext(tab_name)
         
         # 从TextDisplay获取文件内容 - 修复AttributeError
         if not hasattr(editor, 'file_path') or not editor.file_path:
             print("错误：编辑器没有关联的文件路径")
-            return
-            
-        try:
-            # 使用已有的文件加载方法读取完整文件内容
-            content = self.load_file(editor.file_path)
-            if content is None:
-                print(f"错误：无法读取文件 {editor.file_path}")
-                return
-            lines = content.splitlines()
-        except Exception as e:
-            print(f"读取文件内容失败: {e}")
-            return
-        
-        # 修复：使用ignore_alpha参数而不是ignore_alpha（应该是case_sensitive的反义）
-        case_sensitive = not ignore_alpha
-        
-        # 应用过滤
-        filtered_lines = list(filter_lines(lines, include_keywords, exclude_keywords, 
-                                         ignore_case=ignore_alpha, whole_word=whole_pair))
+            return None
 
         file_path, _ = QFileDialog.getSaveFileName(
             None, "保存过滤结果", f"{name}_result.txt", "Text Files (*.txt);;All Files (*)"
         )
         if not file_path:
-            return
+            return None
 
         dir_path = os.path.dirname(file_path)
         info_path = os.path.join(dir_path, f"{name}_info.txt")
@@ -105,28 +197,10 @@ class FileHandler:
         patterns_info = self._generate_patterns_info(include_keywords, exclude_keywords, 
                                                    ignore_alpha, whole_pair, show_only)
 
-        # 保存过滤条件和pattern信息到info文件
-        with open(info_path, 'w', encoding='utf-8') as f:
-            f.write("【过滤条件】\n")
-            f.write(f"包含关键词: {include_keywords if include_keywords else '无'}\n")
-            f.write(f"排除关键词: {exclude_keywords if exclude_keywords else '无'}\n")
-            f.write(f"忽略大小写: {'是' if ignore_alpha else '否'}\n")
-            f.write(f"全词匹配: {'是' if whole_pair else '否'}\n")
-            f.write(f"仅显示匹配行: {'是' if show_only else '否'}\n")
-            f.write(f"匹配结果总数: {len(filtered_lines)} 行\n")
-            f.write(f"原文件总行数: {len(lines)} 行\n\n")
-            
-            f.write("【搜索模式详情】\n")
-            f.write(patterns_info)
-
-        # 保存过滤结果 - 仅包含结果行
-        with open(result_path, 'w', encoding='utf-8') as f:
-            for line in filtered_lines:
-                f.write(line + '\n')
-
-        print(f"过滤条件已保存到: {info_path}")
-        print(f"过滤结果已保存到: {result_path}")
-        print(f"共找到 {len(filtered_lines)} 行匹配结果")
+        job = ExportJob(editor, include_keywords, exclude_keywords, show_only,
+                        ignore_alpha, whole_pair, patterns_info, info_path, result_path)
+        QThreadPool.globalInstance().start(job)
+        return job.signals
 
     def _generate_patterns_info(self, include_keywords: list[str], exclude_keywords: list[str], 
                           ignore_alpha: bool, whole_pair: bool, show_only: bool) -> str:
@@ -6,12 +6,19 @@ import time
 import re
 import queue
 import psutil
+try:
+    import re2  # 可选：RE2引擎，多关键词交替模式保证线性时间
+except ImportError:
+    re2 = None
 from typing import Optional, List, Tuple, Dict, Set
 from dataclasses import dataclass
 from functools import lru_cache
 import concurrent.futures
 from collections import deque
 import gc
+from bisect import bisect_left
+from itertools import accumulate, count
+from operator import add
 
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QVBoxLayout, QWidget, 
                              QScrollArea, QLabel, QPushButton, QHBoxLayout, 
@@ -41,20 +48,27 @@ class AdvancedSearchStats:
 
 
 class MemoryMappedFileReader:
-    """内存映射文件读取器 - 减少IO开销"""
+    """
+    内存映射文件读取器 - 减少IO开销
+
+    read_line只做切片，没有共享的文件读写位置，同一个读取器可以被多个搜索线程同时使用
+    """
     
     def __init__(self, file_path: str):
         self.file_path = file_path
         self.file = None
         self.mmap_obj = None
+        self.data = b''
         self.file_size = 0
         
     def __enter__(self):
         self.file = open(self.file_path, 'rb')
         self.file_size = os.path.getsize(self.file_path)
-        # 只有文件足够大时才使用mmap
+        # 只有文件足够大时才使用mmap，小文件直接整体读入内存
         if self.file_size > 1024 * 1024:  # 1MB以上使用mmap
             self.mmap_obj = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            self.data = self.file.read()
         return self
         
     def __exit__(self, exc_type, exc_val, exc_tb):
@@ -68,8 +82,66 @@ class MemoryMappedFileReader:
         if self.mmap_obj:
             return self.mmap_obj[start_offset:end_offset]
         else:
-            self.file.seek(start_offset)
-            return self.file.read(end_offset - start_offset)
+            return self.data[start_offset:end_offset]
+
+
+@lru_cache(maxsize=32)
+def _compile_keyword_patterns(keywords: tuple, case_sensitive: bool,
+                              use_regex: bool, whole_word_only: bool) -> Tuple[re.Pattern, ...]:
+    """
+    逐个编译关键词模式，按 (关键词, 选项) 缓存
+
+    缓存放在模块级：同一组关键词重复搜索时直接复用，且不会像方法上的
+    lru_cache 那样以 self 为键、把每个匹配器实例一直留在缓存里
+    """
+    flags = 0 if case_sensitive else re.IGNORECASE
+    patterns = []
+    
+    for keyword in keywords:
+        pattern = keyword
+        
+        if not use_regex:
+            pattern = re.escape(pattern)
+            
+        if whole_word_only:
+            pattern = r'\b' + pattern + r'\b'
+            
+        try:
+            patterns.append(re.compile(pattern, flags))
+        except re.error as e:
+            raise ValueError(f"正则表达式错误: {keyword} - {e}")
+            
+    return tuple(patterns)
+
+
+@lru_cache(maxsize=32)
+def _compile_alternation_pattern(keywords: tuple, case_sensitive: bool,
+                                 use_regex: bool, whole_word_only: bool) -> Optional[re.Pattern]:
+    """
+    把多个关键词合并成一个交替模式，任一关键词命中即匹配，只需扫描一次
+
+    长关键词排在前面；全词匹配时只在整个交替组外包一层 \\b。
+    用户正则可能含有按编号的反向引用，合并后编号会错位，因此正则模式下不合并
+    """
+    if not keywords or use_regex:
+        return None
+    
+    alternatives = [re.escape(keyword) for keyword in sorted(keywords, key=len, reverse=True)]
+    pattern = '(?:' + '|'.join(alternatives) + ')'
+    if whole_word_only:
+        pattern = r'\b' + pattern + r'\b'
+    
+    # 安装了RE2时优先使用；RE2的 \b 只认ASCII单词字符，全词匹配含非ASCII关键词时仍用re
+    if re2 is not None and (not whole_word_only or all(keyword.isascii() for keyword in keywords)):
+        try:
+            return re2.compile(('' if case_sensitive else '(?i)') + pattern)
+        except Exception:
+            pass  # 回退到re
+    
+    try:
+        return re.compile(pattern, 0 if case_sensitive else re.IGNORECASE)
+    except re.error as e:
+        raise ValueError(f"正则表达式错误: {pattern} - {e}")
 
 
 class OptimizedPatternMatcher:
@@ -85,36 +157,33 @@ class OptimizedPatternMatcher:
         self.whole_word_only = whole_word_only
         
         # 编译模式并缓存
-        self.include_patterns = self._compile_patterns(tuple(include_keywords))  # 转换为tuple
-        self.exclude_patterns = self._compile_patterns(tuple(exclude_keywords))  # 转换为tuple
+        options = (case_sensitive, use_regex, whole_word_only)
+        self.include_patterns = _compile_keyword_patterns(tuple(include_keywords), *options)
+        self.exclude_patterns = _compile_keyword_patterns(tuple(exclude_keywords), *options)
+        self.exclude_pattern = _compile_alternation_pattern(tuple(exclude_keywords), *options)
         
-        # 简单字符串匹配优化
+        # 简单字符串匹配优化；全词匹配时也用这些子串在跑正则前快速排除不可能匹配的行
         self.use_simple_search = not use_regex and not whole_word_only
-        if self.use_simple_search:
+        if not use_regex:
             self.include_strs = [k.lower() if not case_sensitive else k for k in include_keywords]
             self.exclude_strs = [k.lower() if not case_sensitive else k for k in exclude_keywords]
     
-    @lru_cache(maxsize=1000)
-    def _compile_patterns(self, keywords: tuple) -> List[re.Pattern]:
-        """编译并缓存正则表达式模式"""
-        flags = 0 if self.case_sensitive else re.IGNORECASE
-        patterns = []
-        
-        for keyword in keywords:
-            pattern = keyword
-            
-            if not self.use_regex:
-                pattern = re.escape(pattern)
-                
-            if self.whole_word_only:
-                pattern = r'\b' + pattern + r'\b'
-                
-            try:
-                patterns.append(re.compile(pattern, flags))
-            except re.error as e:
-                raise ValueError(f"正则表达式错误: {keyword} - {e}")
-                
-        return patterns
+    def get_candidate_pattern(self, match_all_includes: bool = True) -> Optional[re.Pattern]:
+        """
+        获取用于整段文本预筛选候选行的模式，不能预筛选时返回None
+
+        匹配的行一定能被该模式找到：AND逻辑下取最长的包含词（通常最有区分度），
+        OR逻辑下取所有包含词的交替模式。用户正则可能含有 ^、$ 等依赖行边界的写法，
+        在整段文本上搜索会漏掉匹配，因此正则模式下不做预筛选
+        """
+        if self.use_regex or not self.include_keywords:
+            return None
+        
+        options = (self.case_sensitive, self.use_regex, self.whole_word_only)
+        if match_all_includes:
+            longest = max(self.include_keywords, key=len)
+            return _compile_keyword_patterns((longest,), *options)[0]
+        return _compile_alternation_pattern(tuple(self.include_keywords), *options)
     
     def matches_line(self, line_content: str, match_all_includes: bool = True) -> Tuple[bool, List[re.Match]]:
         """
@@ -127,6 +196,12 @@ class OptimizedPatternMatcher:
                 for exclude_str in self.exclude_strs:
                     if exclude_str in line_lower:
                         return False, []
+            elif self.exclude_pattern:
+                # 全词匹配：行里连排除词子串都没有时，不必再跑带 \b 的正则
+                line_lower = line_content.lower() if not self.case_sensitive else line_content
+                if (any(exclude_str in line_lower for exclude_str in self.exclude_strs)
+                        and self.exclude_pattern.search(line_content)):
+                    return False, []
             else:
                 for exclude_pattern in self.exclude_patterns:
                     if exclude_pattern.search(line_content):
@@ -165,6 +240,13 @@ class OptimizedPatternMatcher:
                         return True, found_matches
                 return False, []
         else:
+            # 全词匹配：先按子串快速排除，AND缺任一包含词、OR一个都没有时不可能匹配
+            if not self.use_regex:
+                line_lower = line_content.lower() if not self.case_sensitive else line_content
+                present = [include_str in line_lower for include_str in self.include_strs]
+                if not (all(present) if match_all_includes else any(present)):
+                    return False, []
+            
             # 正则表达式搜索
             if match_all_includes:
                 matched_patterns = 0
@@ -210,7 +292,7 @@ class HighPerformanceSearchEngine(QThread):
     
     # 信号定义
     search_progress = pyqtSignal(int, int)           # 进度百分比, 已找到结果数
-    search_result_found = pyqtSignal(object)         # 找到的搜索结果
+    search_results_found = pyqtSignal(list)          # 一批找到的搜索结果
     search_finished = pyqtSignal(int, float)         # 搜索完成: 结果数量, 耗时
     search_error = pyqtSignal(str)                   # 搜索错误信息
     search_stats = pyqtSignal(object)                # 搜索统计信息
@@ -241,6 +323,7 @@ class HighPerformanceSearchEngine(QThread):
         
         # 缓存和优化
         self.pattern_matcher = None
+        self.reader = None  # 本次搜索共用的文件读取器，由run()打开
         self.decoder_cache = {}  # 编码缓存
         
     def _calculate_optimal_chunk_size(self) -> int:
@@ -290,15 +373,6 @@ class HighPerformanceSearchEngine(QThread):
             
         return chunks
     
-    def _decode_line_optimized(self, line_data: bytes) -> str:
-        """优化的行解码 - 缓存编码类型"""
-        # 尝试UTF-8解码
-        try:
-            return line_data.decode('utf-8', errors='ignore').rstrip('\n\r')
-        except UnicodeDecodeError:
-            # 回退到latin1
-            return line_data.decode('latin1', errors='ignore').rstrip('\n\r')
-    
     def _search_line_chunk_optimized(self, start_line: int, end_line: int) -> List[SearchResult]:
         """
         优化的行块搜索
@@ -312,80 +386,102 @@ class HighPerformanceSearchEngine(QThread):
         processed_count = 0
         
         try:
-            with MemoryMappedFileReader(self.file_path) as reader:
-                for line_number in range(start_line, end_line):
-                    if self.should_stop or (self.enable_early_stop and self.total_results >= self.max_results):
-                        break
-                    
-                    if line_number >= len(self.line_offsets) - 1:
-                        break
-                    
-                    # 读取行数据
-                    start_offset = self.line_offsets[line_number]
-                    end_offset = self.line_offsets[line_number + 1]
-                    
-                    line_data = reader.read_line(start_offset, end_offset)
-                    line_content = self._decode_line_optimized(line_data)
-                    
-                    # 使用优化的模式匹配器
-                    matches_criteria, matches = self.pattern_matcher.matches_line(
-                        line_content, self.match_all_includes)
-                    
-                    if matches_criteria:
-                        if matches:
-                            # 有具体匹配位置
-                            for match in matches:
-                                result = SearchResult(
-                                    line_number=line_number,
-                                    column_start=match.start(),
-                                    column_end=match.end(),
-                                    matched_text=match.group(),
-                                    line_content=line_content,
-                                    file_offset=start_offset + match.start()
-                                )
-                                results.append(result)
-                        else:
-                            # 只有排除条件匹配
+            end_line = min(end_line, len(self.line_offsets) - 1)
+            if start_line >= end_line:
+                return results
+            
+            # 整块只切片、解码一次，再在C层按换行符拆分
+            chunk_data = self.reader.read_line(self.line_offsets[start_line], self.line_offsets[end_line])
+            chunk_text = chunk_data.decode('utf-8', errors='ignore')
+            lines = chunk_text.split('\n')[:end_line - start_line]
+            
+            # 有包含词时先用一次整段搜索找出候选行，只对候选行做完整匹配
+            candidate_pattern = self.pattern_matcher.get_candidate_pattern(self.match_all_includes)
+            if candidate_pattern is None:
+                line_indexes = range(len(lines))
+            else:
+                line_indexes = self._candidate_line_indexes(candidate_pattern, chunk_text, lines)
+            
+            for line_index in line_indexes:
+                if self.should_stop or (self.enable_early_stop and self.total_results >= self.max_results):
+                    break
+                
+                line_number = start_line + line_index
+                start_offset = self.line_offsets[line_number]
+                line_content = lines[line_index].rstrip('\n\r')
+                
+                # 使用优化的模式匹配器
+                matches_criteria, matches = self.pattern_matcher.matches_line(
+                    line_content, self.match_all_includes)
+                
+                if matches_criteria:
+                    if matches:
+                        # 有具体匹配位置
+                        for match in matches:
                             result = SearchResult(
                                 line_number=line_number,
-                                column_start=0,
-                                column_end=len(line_content),
-                                matched_text=line_content,
+                                column_start=match.start(),
+                                column_end=match.end(),
+                                matched_text=match.group(),
                                 line_content=line_content,
-                                file_offset=start_offset
+                                file_offset=start_offset + match.start()
                             )
                             results.append(result)
-                    
-                    processed_count += 1
-                    
-                    # 每处理一定数量的行就检查停止条件
-                    if processed_count % 200 == 0:
-                        if self.should_stop:
-                            break
-                        # 减少让出CPU的频率
-                        if processed_count % 1000 == 0:
-                            self.msleep(1)
-                            
+                    else:
+                        # 只有排除条件匹配
+                        result = SearchResult(
+                            line_number=line_number,
+                            column_start=0,
+                            column_end=len(line_content),
+                            matched_text=line_content,
+                            line_content=line_content,
+                            file_offset=start_offset
+                        )
+                        results.append(result)
+                
+                processed_count += 1
+                
+                # 每处理一定数量的行就检查停止条件
+                if processed_count % 200 == 0:
+                    if self.should_stop:
+                        break
+                    # 减少让出CPU的频率
+                    if processed_count % 1000 == 0:
+                        self.msleep(1)
+                        
         except Exception as e:
             print(f"搜索块错误 ({start_line}-{end_line}): {e}")
             
         return results
     
+    @staticmethod
+    def _candidate_line_indexes(pattern: re.Pattern, text: str, lines: List[str]):
+        """
+        在整段文本上用 pattern 逐个查找，产出含有匹配的行下标（每行最多一次）
+
+        第i行的换行符在text中的位置 = 前i+1行长度之和 + i，二分查找即可由匹配位置得到行号；
+        命中后直接从下一行开头继续搜索
+        """
+        line_ends = list(map(add, accumulate(map(len, lines)), count(0)))
+        search = pattern.search
+        pos = 0
+        while True:
+            match = search(text, pos)
+            if match is None:
+                return
+            line_index = bisect_left(line_ends, match.start())
+            if line_index >= len(lines):
+                return
+            yield line_index
+            pos = line_ends[line_index] + 1
+    
     def _emit_results_batch(self, results: List[SearchResult]):
-        """批量发送结果 - 减少信号开销"""
-        batch = []
-        for result in results:
-            batch.append(result)
-            if len(batch) >= self.batch_emit_size:
-                for r in batch:
-                    self.search_result_found.emit(r)
-                    self.total_results += 1
-                batch.clear()
-                
-        # 发送剩余结果
-        for r in batch:
-            self.search_result_found.emit(r)
-            self.total_results += 1
+        """批量发送结果 - 每批只发一次信号，接收方整批入库、只刷新一次"""
+        batch_size = self.batch_emit_size
+        for i in range(0, len(results), batch_size):
+            batch = results[i:i + batch_size]
+            self.search_results_found.emit(batch)
+            self.total_results += len(batch)
     
     def run(self):
         """主搜索线程"""
@@ -408,11 +504,12 @@ class HighPerformanceSearchEngine(QThread):
             
             print(f"开始搜索: {self.total_lines}行, {total_chunks}个块, {self.num_threads}个线程")
             
-            # 使用优化的线程池
-            with concurrent.futures.ThreadPoolExecutor(
-                max_workers=self.num_threads,
-                thread_name_prefix="SearchWorker"
-            ) as executor:
+            # 整个搜索只映射一次文件，所有工作线程共用；线程池退出后才关闭映射
+            with MemoryMappedFileReader(self.file_path) as self.reader, \
+                 concurrent.futures.ThreadPoolExecutor(
+                     max_workers=self.num_threads,
+                     thread_name_prefix="SearchWorker"
+                 ) as executor:
                 
                 # 提交搜索任务
                 future_to_chunk = {
@@ -479,6 +576,7 @@ class HighPerformanceSearchEngine(QThread):
             self.search_error.emit(f"搜索引擎错误: {e}")
         finally:
             # 清理缓存
+            self.reader = None
             self.decoder_cache.clear()
             gc.collect()  # 强制垃圾回收
     
@@ -566,7 +664,8 @@ class RealTimeSearchEngine(HighPerformanceSearchEngine):
             print(f"实时搜索开始: {'采样模式' if self.enable_sampling else '完整模式'}, "
                   f"{len(chunks)}个块")
             
-            with concurrent.futures.ThreadPoolExecutor(max_workers=self.num_threads) as executor:
+            with MemoryMappedFileReader(self.file_path) as self.reader, \
+                 concurrent.futures.ThreadPoolExecutor(max_workers=self.num_threads) as executor:
                 future_to_chunk = {
                     executor.submit(self._search_line_chunk_optimized, start, end): (start, end)
                     for start, end in chunks
@@ -599,6 +698,8 @@ class RealTimeSearchEngine(HighPerformanceSearchEngine):
             
         except Exception as e:
             self.search_error.emit(f"实时搜索错误: {e}")
+        finally:
+            self.reader = None
 
 
 # 搜索引擎工厂 - 更新版本
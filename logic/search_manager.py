@@ -1,4 +1,7 @@
-import re
+import heapq
+from array import array
+from bisect import bisect_left, bisect_right
+from operator import attrgetter
 from typing import Optional, List, Tuple, Dict, Set
 
 from widgets.search_table import SearchTable
@@ -18,6 +21,9 @@ class SearchResultsManager(QObject):
     def __init__(self):
         super().__init__()
         self.results: List[SearchResult] = []  # 所有搜索结果
+        self.result_lines = array('q')         # 与results平行的有序行号，用于二分查找
+        self.result_starts = array('q')        # 与results平行的起始列，绘制高亮时不必逐个访问结果对象
+        self.result_ends = array('q')          # 与results平行的结束列
         self.current_index = -1                # 当前结果索引
         self.results_mutex = QMutex()          # 线程安全锁
         
@@ -29,27 +35,71 @@ class SearchResultsManager(QObject):
             result: 新的搜索结果
         """
         with QMutexLocker(self.results_mutex):
-            # 插入排序，保持结果按行号排序
-            insert_pos = 0
-            for i, existing_result in enumerate(self.results):
-                if (result.line_number < existing_result.line_number or 
-                    (result.line_number == existing_result.line_number and 
-                     result.column_start < existing_result.column_start)):
+            # 二分查找同一行的结果范围，再按列号确定插入位置，保持结果有序
+            line_number = result.line_number
+            lo = bisect_left(self.result_lines, line_number)
+            insert_pos = bisect_right(self.result_lines, line_number, lo)
+            for i in range(lo, insert_pos):
+                if result.column_start < self.results[i].column_start:
                     insert_pos = i
                     break
-                insert_pos = i + 1
                 
             self.results.insert(insert_pos, result)
+            self.result_lines.insert(insert_pos, line_number)
+            self.result_starts.insert(insert_pos, result.column_start)
+            self.result_ends.insert(insert_pos, result.column_end)
             
             # 如果是第一个结果，自动选中
             if len(self.results) == 1:
                 self.current_index = 0
                 self.current_result_changed.emit(result)
     
+    def add_results(self, results: List[SearchResult]):
+        """
+        批量添加搜索结果（线程安全），整批只加锁一次
+
+        Args:
+            results: 一批新的搜索结果，顺序任意
+        """
+        if not results:
+            return
+        
+        # 与add_result相同的顺序：按(行号, 起始列)，同列时先到的在前（sorted和heapq.merge都是稳定的）
+        sort_key = attrgetter('line_number', 'column_start')
+        batch = sorted(results, key=sort_key)
+        
+        with QMutexLocker(self.results_mutex):
+            was_empty = not self.results
+            
+            if was_empty or batch[0].line_number > self.result_lines[-1]:
+                # 整批都在已有结果之后，直接追加
+                self._extend_columns(batch)
+                self.results.extend(batch)
+            else:
+                self.results = list(heapq.merge(self.results, batch, key=sort_key))
+                self.result_lines = array('q')
+                self.result_starts = array('q')
+                self.result_ends = array('q')
+                self._extend_columns(self.results)
+            
+            # 如果是第一批结果，自动选中第一个
+            if was_empty:
+                self.current_index = 0
+                self.current_result_changed.emit(self.results[0])
+    
+    def _extend_columns(self, results: List[SearchResult]):
+        """把结果的行号和列范围追加到平行数组（调用方需持有锁）"""
+        self.result_lines.extend(map(attrgetter('line_number'), results))
+        self.result_starts.extend(map(attrgetter('column_start'), results))
+        self.result_ends.extend(map(attrgetter('column_end'), results))
+    
     def clear_results(self):
         """清空所有搜索结果"""
         with QMutexLocker(self.results_mutex):
             self.results.clear()
+            self.result_lines = array('q')
+            self.result_starts = array('q')
+            self.result_ends = array('q')
             self.current_index = -1
     
     def get_result_count(self) -> int:
@@ -57,6 +107,40 @@ class SearchResultsManager(QObject):
         with QMutexLocker(self.results_mutex):
             return len(self.results)
     
+    def get_results_in_line_range(self, first_line: int, last_line: int) -> List[SearchResult]:
+        """
+        获取行号在 [first_line, last_line) 范围内的结果
+        
+        Args:
+            first_line: 起始行号（包含）
+            last_line: 结束行号（不包含）
+        """
+        with QMutexLocker(self.results_mutex):
+            lo = bisect_left(self.result_lines, first_line)
+            hi = bisect_left(self.result_lines, last_line, lo)
+            return self.results[lo:hi]
+    
+    def get_spans_in_line_range(self, first_line: int,
+                                last_line: int) -> Tuple[array, array, array]:
+        """
+        获取行号在 [first_line, last_line) 范围内结果的 (行号, 起始列, 结束列) 三列
+
+        返回的是平行数组的切片，按(行号, 起始列)有序，供绘制高亮使用
+        """
+        with QMutexLocker(self.results_mutex):
+            lo = bisect_left(self.result_lines, first_line)
+            hi = bisect_left(self.result_lines, last_line, lo)
+            return self.result_lines[lo:hi], self.result_starts[lo:hi], self.result_ends[lo:hi]
+    
+    def get_matching_lines(self) -> List[int]:
+        """
+        获取有匹配结果的行号（去重、升序）
+
+        结果本身按行号有序，dict.fromkeys 一次线性去重即可，无需逐个做列表成员判断
+        """
+        with QMutexLocker(self.results_mutex):
+            return list(dict.fromkeys(self.result_lines))
+    
     def get_current_result(self) -> Optional[SearchResult]:
         """获取当前选中的结果"""
         with QMutexLocker(self.results_mutex):
@@ -122,38 +206,13 @@ class SearchManager(QObject):
         include_keywords = []
         exclude_keywords = []
 
-        for row in range(table.rowCount()):
-            checkbox_widget = table.cellWidget(row, 0)
-            if checkbox_widget and hasattr(checkbox_widget, 'checkbox') and checkbox_widget.checkbox.isChecked():
-                desc_item = table.item(row, 2)
-
-                if desc_item:
-                    # 解析描述文本中的关键词
-                    include_part = re.search(r"包含：(.*?)\n", desc_item.text())
-                    exclude_part = re.search(r"排除：(.*)", desc_item.text())
-
-                    if include_part:
-                        include_keywords += self._extract_keywords(include_part)
-                    if exclude_part:
-                        exclude_keywords += self._extract_keywords(exclude_part)
+        # 表格行上保存着原始关键词列表，直接取用，不再用正则解析描述文本
+        for row_data in table.get_checked_rows_data():
+            include_keywords += [kw.strip() for kw in row_data['include_keywords'] if kw.strip()]
+            exclude_keywords += [kw.strip() for kw in row_data['exclude_keywords'] if kw.strip()]
 
         return list(set(include_keywords)), list(set(exclude_keywords))
 
-    def _extract_keywords(self, match: re.Match) -> list[str]:
-        """
-        从正则匹配结果中提取关键词列表
-        
-        Args:
-            match: 正则匹配对象
-            
-        Returns:
-            关键词列表
-        """
-        keywords_text = match.group(1).strip()
-        if not keywords_text or keywords_text == "无":
-            return []
-        return [kw.strip() for kw in keywords_text.split(',') if kw.strip()]
-
     def format_pattern_display(self, include_keywords: list[str], exclude_keywords: list[str]) -> str:
         """
         格式化显示搜索模式
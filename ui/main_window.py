@@ -11,7 +11,7 @@ from PyQt5.QtWidgets import QDialog, QInputDialog
 
 import re
 
-from widgets.code_editor import TextDisplay
+from widgets.code_editor import TextDisplay, get_cached_line_offsets
 from widgets.search_table import SearchTable
 from logic.search_manager import SearchManager
 from logic.file_io import FileHandler
@@ -86,8 +86,14 @@ class MainWindow(QMainWindow):
                 # 停止预加载线程
                 if hasattr(editor, 'preload_thread') and editor.preload_thread:
                     if editor.preload_thread.isRunning():
-                        editor.preload_thread.quit()
+                        editor.preload_thread.stop()
                         editor.preload_thread.wait(1000)
+                
+                # 停止预读线程
+                if hasattr(editor, 'prefault_thread') and editor.prefault_thread:
+                    if editor.prefault_thread.isRunning():
+                        editor.prefault_thread.stop()
+                        editor.prefault_thread.wait(1000)
         
         # 清理资源
         self.active_search_engines.clear()
@@ -103,7 +109,7 @@ class MainWindow(QMainWindow):
         self.menu_download.triggered.connect(self._download_results)
         self.apply.clicked.connect(self._apply_filters)
         self.reset_button.clicked.connect(self._reset_editor)
-        self.tabs.tabCloseRequested.connect(self.tabs.removeTab)
+        self.tabs.tabCloseRequested.connect(self._close_tab)
         self.norm_input.triggered.connect(self._input_regex_filter)
         
         # 绑定实时搜索
@@ -114,6 +120,18 @@ class MainWindow(QMainWindow):
         # self.zoom_out_action.triggered.connect(self._zoom_out_current_editor)
         # self.reset_zoom_action.triggered.connect(self._reset_zoom_current_editor)
 
+    def _close_tab(self, index: int):
+        """关闭标签页，并释放该编辑器的映射和文件句柄"""
+        editor = self.tabs.widget(index)
+        self.tabs.removeTab(index)
+        if isinstance(editor, TextDisplay):
+            engine = getattr(editor, 'current_search_engine', None)
+            if engine and engine.isRunning():
+                engine.stop_search()
+                engine.wait(2000)
+            editor.cleanup_resources()
+            editor.deleteLater()
+
     def dragEnterEvent(self, event: QDragEnterEvent):
         """拖拽进入事件"""
         if event.mimeData().hasUrls():
@@ -199,17 +217,13 @@ class MainWindow(QMainWindow):
         editor = self._get_current_editor()
         if editor:
             # 清除搜索结果和过滤
-            editor.search_results_manager.clear_results()
-            editor.set_filter_mode(False)
-            editor.update()
+            editor.clear_search_state()
 
     def _reset_editor(self):
         """重置编辑器状态"""
         editor = self._get_current_editor()
         if editor:
-            editor.search_results_manager.clear_results()
-            editor.set_filter_mode(False)
-            editor.update()
+            editor.clear_search_state()
         
         # 清除搜索输入
         self.in_word.clear()
@@ -347,10 +361,7 @@ class MainWindow(QMainWindow):
                     self.active_search_engines.remove(editor.current_search_engine)
 
         # 清除之前的搜索结果
-        editor.search_results_manager.clear_results()
-        
-        if show_only:
-            editor.set_filter_mode(False)
+        editor.clear_search_state(reset_filter=show_only)
         
         # 创建搜索引擎 - 选择合适的引擎类型
         total_lines = len(editor.line_offsets) - 1
@@ -387,8 +398,8 @@ class MainWindow(QMainWindow):
             lambda total, elapsed: self.on_regex_search_finished(total, elapsed, editor, show_only)
         )
         search_engine.search_error.connect(self.on_search_error)
-        search_engine.search_result_found.connect(
-            lambda result: self.on_search_result_found(result, editor, show_only)
+        search_engine.search_results_found.connect(
+            lambda results: self.on_search_results_found(results, editor, show_only)
         )
         
         if hasattr(search_engine, 'search_stats'):
@@ -443,11 +454,7 @@ class MainWindow(QMainWindow):
                         total_all_tabs += len(tab_editor.search_results_manager.results)
                     
                     if show_only and len(tab_editor.search_results_manager.results) > 0:
-                        matching_lines = []
-                        with QMutexLocker(tab_editor.search_results_manager.results_mutex):
-                            for result in tab_editor.search_results_manager.results:
-                                if result.line_number not in matching_lines:
-                                    matching_lines.append(result.line_number)
+                        matching_lines = tab_editor.search_results_manager.get_matching_lines()
                         
                         if matching_lines:
                             tab_editor.set_filter_mode(True, matching_lines)
@@ -462,11 +469,7 @@ class MainWindow(QMainWindow):
         
         # 应用过滤模式
         if show_only and total_results > 0 and not self.all_page.isChecked():
-            matching_lines = []
-            with QMutexLocker(editor.search_results_manager.results_mutex):
-                for result in editor.search_results_manager.results:
-                    if result.line_number not in matching_lines:
-                        matching_lines.append(result.line_number)
+            matching_lines = editor.search_results_manager.get_matching_lines()
             
             if matching_lines:
                 editor.set_filter_mode(True, matching_lines)
@@ -496,7 +499,8 @@ class MainWindow(QMainWindow):
         description = "\n".join(desc_parts)
         
         # 更新搜索表格
-        self._display_results(total_results, "正则搜索完成", description, include_all, exclude_all)
+        self._display_results(total_results, "正则搜索完成", description, include_all, exclude_all,
+                             is_regex=True)
 
 
     def _import_logs(self):
@@ -518,11 +522,17 @@ class MainWindow(QMainWindow):
             size_mb = file_size / (1024 * 1024)
             return size_mb
         
-        size_mb = get_size(filepath)
-        self.status_label.setText(f"🔄 正在建立索引... 文件大小: {size_mb:.1f}MB")
-
         # 保存文件路径
         self._pending_file_path = filepath
+        
+        # 最近打开过且未修改的文件直接复用已有索引
+        line_offsets = get_cached_line_offsets(filepath)
+        if line_offsets is not None:
+            self._open_editor_tab(filepath, line_offsets)
+            return
+        
+        size_mb = get_size(filepath)
+        self.status_label.setText(f"🔄 正在建立索引... 文件大小: {size_mb:.1f}MB")
         self.setIndexer(filepath, None)
         
     def setIndexer(self, file_path: str, text_widget: TextDisplay = None):
@@ -603,12 +613,8 @@ class MainWindow(QMainWindow):
                 if editor.current_search_engine in self.active_search_engines:
                     self.active_search_engines.remove(editor.current_search_engine)
 
-        # 清除之前的搜索结果
-        editor.search_results_manager.clear_results()
-        
-        # 如果是只显示匹配行模式，重置过滤状态
-        if show_only:
-            editor.set_filter_mode(False)  # 先重置为全部显示
+        # 清除之前的搜索结果；如果是只显示匹配行模式，同时重置过滤状态
+        editor.clear_search_state(reset_filter=show_only)
         
         # 🎯 使用新的搜索引擎工厂创建最佳引擎
         total_lines = len(editor.line_offsets) - 1
@@ -648,8 +654,8 @@ class MainWindow(QMainWindow):
             lambda total, elapsed: self.on_search_finished(total, elapsed, editor, show_only)
         )
         search_engine.search_error.connect(self.on_search_error)
-        search_engine.search_result_found.connect(
-            lambda result: self.on_search_result_found(result, editor, show_only)
+        search_engine.search_results_found.connect(
+            lambda results: self.on_search_results_found(results, editor, show_only)
         )
         
         # 连接新的统计信号（如果存在）
@@ -684,7 +690,7 @@ class MainWindow(QMainWindow):
                 self.status_label.setText(f"{current_status} | {throughput_info}")
 
     def _display_results(self, results_count: int, pattern: str, desc: str, 
-                        include_all: list[str], exclude_all: list[str]):
+                        include_all: list[str], exclude_all: list[str], is_regex: bool = False):
         """显示搜索结果"""
         if not self.search_table:
             self.search_table = SearchTable()
@@ -694,11 +700,21 @@ class MainWindow(QMainWindow):
             
             # 连接表格变化事件到实时搜索
             self.search_table.checkbox_changed.connect(self._on_table_changed)
+            self.search_table.regex_entry_requested.connect(self._add_regex_entry)
         
         # 格式化模式显示
         formatted_pattern = self.search_manager.format_pattern_display(include_all, exclude_all)
         
-        self.search_table.table_add_row(results_count, include_all, exclude_all, desc)
+        self.search_table.table_add_row(results_count, include_all, exclude_all, desc, is_regex)
+
+    def _add_regex_entry(self):
+        """从搜索表格的右键菜单添加正则条目，匹配数按当前标签页统计"""
+        editor = self._get_current_editor()
+        if not editor:
+            QMessageBox.warning(self, "输入警告", "请先加载文件！")
+            return
+        ignore_case = not self.Maxmi.isChecked()  # 与正则搜索相同：取反
+        self.search_table.add_regex_entry_from_user(self, editor, ignore_case)
 
     def _get_current_editor(self) -> TextDisplay | None:
         """获得当前的tab"""
@@ -725,11 +741,27 @@ class MainWindow(QMainWindow):
         ignore_case = self.Maxmi.isChecked()
         whole_pair = self.whole_pair_check.isChecked()
 
-        self.file_handler.save_filtered_result(
+        export_signals = self.file_handler.save_filtered_result(
             editor, include_all, exclude_all,
             show_only, ignore_case, whole_pair,
             self.tabs.tabText(self.tabs.currentIndex())
         )
+        if export_signals is None:
+            return
+        
+        # 导出在线程池中进行，保留信号对象的引用直到完成
+        self._export_signals = export_signals
+        export_signals.finished.connect(self._on_export_finished)
+        export_signals.error.connect(self._on_export_error)
+        self.status_label.setText("💾 正在导出过滤结果...")
+
+    def _on_export_finished(self, line_count: int, info_path: str, result_path: str):
+        """导出完成"""
+        self.status_label.setText(f"✅ 已导出 {line_count:,} 行到 {result_path}")
+
+    def _on_export_error(self, error_msg: str):
+        """导出出错"""
+        self.status_label.setText(f"❌ {error_msg}")
 
     def on_indexing_progress(self, lines, total_size):
         """索引进度更新"""
@@ -737,10 +769,14 @@ class MainWindow(QMainWindow):
         
     def on_indexing_finished(self, line_offsets):
         """索引建立完成"""
+        self._open_editor_tab(self.indexer.file_path, line_offsets)
+
+    def _open_editor_tab(self, file_path: str, line_offsets):
+        """用已建立的行索引打开文件并添加标签页"""
         text_widget = TextDisplay()
-        filename = os.path.basename(self._pending_file_path)
+        filename = os.path.basename(file_path)
         
-        if text_widget.load_text(self.indexer.file_path, line_offsets):
+        if text_widget.load_text(file_path, line_offsets):
             # 连接字体大小变化信号
             text_widget.font_size_changed.connect(self._on_font_size_changed)
             
@@ -748,7 +784,7 @@ class MainWindow(QMainWindow):
             
             total_lines = len(line_offsets) - 1
             # 显示更详细的文件信息
-            file_size = os.path.getsize(self._pending_file_path) / (1024*1024)
+            file_size = os.path.getsize(file_path) / (1024*1024)
             self.status_label.setText(
                 f"✅ 文件加载完成 - {total_lines:,} 行 | {file_size:.1f}MB"
             )
@@ -777,13 +813,13 @@ class MainWindow(QMainWindow):
         
         return True
 
-    def on_search_result_found(self, result: SearchResult, editor: TextDisplay, show_only: bool = False):
-        """处理找到的搜索结果"""
-        # 将结果添加到对应编辑器的搜索结果管理器
-        editor.search_results_manager.add_result(result)
+    def on_search_results_found(self, results: list[SearchResult], editor: TextDisplay, show_only: bool = False):
+        """处理找到的一批搜索结果"""
+        # 整批添加到对应编辑器的搜索结果管理器
+        editor.search_results_manager.add_results(results)
         
-        # 如果是当前活动的编辑器，更新UI
-        if editor == self._get_current_editor():
+        # 如果是当前活动的编辑器且这批结果落在可见区域内，整批只更新一次UI
+        if editor == self._get_current_editor() and editor.has_visible_results(results):
             editor.update()
 
     def on_search_finished(self, total_results: int, elapsed_time: float, 
@@ -824,11 +860,7 @@ class MainWindow(QMainWindow):
                     
                     # 应用过滤模式到每个标签页
                     if show_only and len(tab_editor.search_results_manager.results) > 0:
-                        matching_lines = []
-                        with QMutexLocker(tab_editor.search_results_manager.results_mutex):
-                            for result in tab_editor.search_results_manager.results:
-                                if result.line_number not in matching_lines:
-                                    matching_lines.append(result.line_number)
+                        matching_lines = tab_editor.search_results_manager.get_matching_lines()
                         
                         if matching_lines:
                             tab_editor.set_filter_mode(True, matching_lines)
@@ -852,11 +884,7 @@ class MainWindow(QMainWindow):
         # 如果是只显示匹配行模式且有结果，切换到过滤模式
         if show_only and total_results > 0 and not self.all_page.isChecked():
             # 收集所有匹配的行号
-            matching_lines = []
-            with QMutexLocker(editor.search_results_manager.results_mutex):
-                for result in editor.search_results_manager.results:
-                    if result.line_number not in matching_lines:
-                        matching_lines.append(result.line_number)
+            matching_lines = editor.search_results_manager.get_matching_lines()
             
             if matching_lines:
                 editor.set_filter_mode(True, matching_lines)
@@ -8,18 +8,147 @@ import os
 import mmap
 import threading
 import time
-from typing import Optional, List, Tuple
+import queue
+from array import array
+from collections import OrderedDict
+from typing import Optional, List, Tuple, Dict
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QVBoxLayout, QWidget, 
                              QScrollArea, QLabel, QPushButton, QHBoxLayout, 
                              QFileDialog, QProgressBar, QLineEdit, QCheckBox,
                              QSpinBox, QGroupBox, QTextEdit, QSplitter)
 from PyQt5.QtCore import (QObject, pyqtSignal, QTimer, Qt, QThread, 
-                          QMutex, QMutexLocker, QRect)
-from PyQt5.QtGui import QFont, QFontMetrics, QPainter, QColor, QPen
+                          QMutex, QMutexLocker, QRect, QPointF)
+from PyQt5.QtGui import QFont, QFontMetrics, QFontInfo, QPainter, QColor, QPen, QStaticText, QTransform
 
 from dataform.search_result import SearchResult
 from logic.search_manager import SearchResultsManager
 
+# 最近打开文件的行索引缓存：(绝对路径, 修改时间, 大小) -> 行偏移
+# 重新打开最近看过且未修改的日志时直接复用行索引，不必重新建立索引。
+# 只缓存行偏移数组；映射和文件句柄归各个标签页所有，关闭标签页时随即释放，
+# 不会在标签页关闭后继续占用文件（Windows上占用会导致日志无法轮转或删除）
+_LINE_OFFSETS_CACHE = OrderedDict()
+_LINE_OFFSETS_CACHE_SIZE = 8
+
+
+def _line_offsets_cache_key(file_path: str) -> tuple:
+    stat = os.stat(file_path)
+    return (os.path.abspath(file_path), stat.st_mtime_ns, stat.st_size)
+
+
+def get_cached_line_offsets(file_path: str) -> Optional[array]:
+    """返回缓存中该文件的行偏移，文件不在缓存中或已被修改时返回None"""
+    try:
+        key = _line_offsets_cache_key(file_path)
+    except OSError:
+        return None
+    line_offsets = _LINE_OFFSETS_CACHE.get(key)
+    if line_offsets is not None:
+        _LINE_OFFSETS_CACHE.move_to_end(key)
+    return line_offsets
+
+
+def _remember_line_offsets(file_path: str, line_offsets: array):
+    """把文件的行偏移放入缓存"""
+    try:
+        key = _line_offsets_cache_key(file_path)
+    except OSError:
+        return
+    
+    # 索引结束于文件末尾，最后一个偏移应等于文件大小；不相等说明建立索引后
+    # 文件又被写入，此时的修改时间和大小已不对应这份偏移，不能缓存
+    if not line_offsets or line_offsets[-1] != key[2]:
+        return
+    
+    # 同一路径的旧版本（文件已被修改）直接失效
+    for stale_key in [k for k in _LINE_OFFSETS_CACHE if k[0] == key[0] and k != key]:
+        del _LINE_OFFSETS_CACHE[stale_key]
+    
+    _LINE_OFFSETS_CACHE[key] = line_offsets
+    _LINE_OFFSETS_CACHE.move_to_end(key)
+    if len(_LINE_OFFSETS_CACHE) > _LINE_OFFSETS_CACHE_SIZE:
+        _LINE_OFFSETS_CACHE.popitem(last=False)
+
+
+class PrefaultThread(QThread):
+    """
+    预读线程 - 在不支持 madvise(MADV_WILLNEED) 的平台上，低优先级地把文件顺序读一遍，
+    提前读入页缓存，避免滚动到远处时才触发缺页读盘
+
+    用普通文件句柄 readinto 到复用的缓冲区：读盘期间释放GIL，不会像在Python里
+    逐页访问映射那样让界面线程等待缺页
+    """
+
+    def __init__(self, file_path: str, block_size: int = 1 << 20):
+        super().__init__()
+        self.file_path = file_path
+        self.block_size = block_size
+        self.should_stop = False
+
+    def run(self):
+        buffer = bytearray(self.block_size)
+        try:
+            with open(self.file_path, 'rb', buffering=0) as f:
+                while not self.should_stop and f.readinto(buffer):
+                    self.msleep(1)  # 每块让出一次CPU
+        except OSError:
+            pass  # 读不了就放弃预读，不影响正常显示
+
+    def stop(self):
+        self.should_stop = True
+
+
+class PreloadThread(QThread):
+    """
+    预加载线程 - 常驻后台，从任务队列取出 (起始显示索引, 行数) 并预先解码这些行。
+    滚动时只需投递任务，不再反复创建和销毁线程
+    """
+
+    def __init__(self, widget):
+        super().__init__()
+        self.widget = widget
+        self.jobs = queue.Queue()
+        self.should_stop = False
+
+    def post(self, start_line: int, count: int):
+        """投递预加载任务"""
+        self.jobs.put((start_line, count))
+
+    def run(self):
+        while not self.should_stop:
+            job = self.jobs.get()
+            # 只处理最新的任务，滚动过程中积压的旧任务直接丢弃
+            while job is not None and not self.jobs.empty():
+                job = self.jobs.get_nowait()
+            if job is None:
+                break
+            self._preload(*job)
+
+    def _preload(self, start_line: int, count: int):
+        # 把显示索引转换成实际行号，合并成连续区间后批量解码
+        widget = self.widget
+        run_start = run_end = -1
+        for i in range(count):
+            if self.should_stop or not self.jobs.empty():
+                return  # 有更新的任务，放弃当前任务
+            actual_line = widget._get_actual_line_number(start_line + i)
+            if actual_line == -1 or not (0 <= actual_line < widget.total_lines):
+                continue
+            if actual_line == run_end:
+                run_end += 1
+                continue
+            if run_start != -1:
+                widget.preload_line_range(run_start, run_end)
+            run_start, run_end = actual_line, actual_line + 1
+        
+        if run_start != -1 and not self.should_stop:
+            widget.preload_line_range(run_start, run_end)
+
+    def stop(self):
+        self.should_stop = True
+        self.jobs.put(None)  # 唤醒阻塞在队列上的线程
+
+
 class TextDisplay(QWidget):
     """
     虚拟文本显示组件 - 只渲染可见行，支持搜索结果高亮、交互式行选择和文本换行
@@ -38,11 +167,12 @@ class TextDisplay(QWidget):
         """初始化动态显示可能需要的参量"""
         # 文件和显示相关
         self.file_path = ""
-        self.line_offsets = []
+        self.line_offsets = array('q')  # 每行起始字节偏移，紧凑的int64数组
         self.visible_lines = 50
         self.line_height = 20
         self.char_width = 8
         self.scroll_position = 0  # 当前显示的第一行行号
+        self.pending_scroll = None  # 尚未执行的滚轮滚动目标
         self.total_lines = 0
 
         # 文件编码相关
@@ -54,7 +184,7 @@ class TextDisplay(QWidget):
 
         # 过滤相关
         self.filter_mode = False
-        self.filtered_line_numbers = []
+        self.filtered_line_numbers = array('q')
         self.line_number_to_display_index = {}
 
         # 动态行号区域宽度
@@ -68,6 +198,10 @@ class TextDisplay(QWidget):
         self.drag_start_y = 0
         self.drag_start_scroll = 0
 
+        # 上次绘制时每个逻辑行占用的区域，用于局部重绘
+        self.line_rects = {}
+        self.line_rects_scroll = -1
+
         self._initmanager()
         self._initEvent()
         self._initColor()
@@ -76,17 +210,25 @@ class TextDisplay(QWidget):
 
     def _initmanager(self):
         """管理缓存与线程"""
-        self.line_cache = {}
-        self.cache_mutex = QMutex()
-        self.max_cache_size = 1000
+        # 行缓存：直接映射的环形缓冲区，键和值分两个数组存放，槽位为 行号 & 掩码
+        self.max_cache_size = 1024  # 必须是2的幂
+        self.cache_mask = self.max_cache_size - 1
+        self.cache_keys = array('q', [-1]) * self.max_cache_size
+        self.cache_vals = [None] * self.max_cache_size
+        self.cache_truncated = bytearray(self.max_cache_size)  # 槽位中的行是否被截断过
+        self.cache_mutex = QMutex()  # 只保护写入，读取不加锁
+        self.max_visible_bytes = 0    # 每行最多解码的字节数，随可显示字符数变化
         
         self.file_mmap = None
         self.file_handle = None
         self.preload_thread = None
+        self.prefault_thread = None
+        self.madvise_mode = None  # 当前对映射文件使用的预读策略
         
     def _initEvent(self):
         # 交互状态
         self.selected_line = -1
+        self.selected_display_index = -1  # 选中行的显示索引，键盘导航直接在其上加减
         self.hover_line = -1
         self.mouse_pressed = False
 
@@ -99,6 +241,9 @@ class TextDisplay(QWidget):
         self.font_size = 10
         self.min_font_size = 6
         self.max_font_size = 72
+        self.line_number_texts = {}  # 行号 -> 预排版的QStaticText
+        self.content_texts = OrderedDict()  # 行内容 -> 预排版的QStaticText（LRU）
+        self.max_content_texts = 500
         self.setFont(self.font)
         self._update_font_metrics()
 
@@ -110,6 +255,28 @@ class TextDisplay(QWidget):
         self.hover_line_color = QColor(200, 200, 200, 50)
         self.line_number_bg_color = QColor(248, 248, 248)
         self.line_number_selected_color = QColor(100, 149, 237, 120)
+        
+        # 绘制时使用的固定颜色/画笔，避免每次重绘都重新构造
+        self.background_color = QColor(255, 255, 255)
+        self.text_color = QColor(0, 0, 0)
+        self.line_number_text_color = QColor(100, 100, 100)
+        self.line_number_selected_text_color = QColor(255, 255, 255)
+        self.separator_color = QColor(200, 200, 200)
+        self.current_search_text_color = QColor(139, 69, 19)
+        self.current_search_pen = QPen(QColor(255, 140, 0), 2)
+        self.focus_pen = QPen(QColor(100, 149, 237), 2)
+        self.scrollbar_bg_color = QColor(240, 240, 240)
+        self.scrollbar_border_color = QColor(200, 200, 200)
+        self.scrollbar_thumb_color = QColor(150, 150, 150, 160)
+        self.scrollbar_thumb_dragging_color = QColor(80, 80, 80, 200)
+        self.scrollbar_thumb_border_color = QColor(100, 100, 100)
+        
+        # 重绘时复用的矩形，通过setRect()更新而不是每行新建
+        self._line_number_area_rect = QRect()
+        self._content_rect = QRect()
+        self._ln_rect = QRect()
+        self._highlight_rect = QRect()
+        self._clip_rect = QRect()
 
     def _initSearchParams(self):
         """初始化搜索所需参数"""
@@ -129,14 +296,18 @@ class TextDisplay(QWidget):
         self.filter_mode = enabled
         
         if enabled and matching_lines:
-            self.filtered_line_numbers = sorted(matching_lines)
-            self.line_number_to_display_index = {
-                line_num: idx for idx, line_num in enumerate(self.filtered_line_numbers)
-            }
+            self.filtered_line_numbers = array('q', sorted(matching_lines))
+            # 实际行号 -> 显示索引，dict(zip(...))在C层构建，无需逐项执行推导式
+            self.line_number_to_display_index = dict(
+                zip(self.filtered_line_numbers, range(len(self.filtered_line_numbers))))
         else:
-            self.filtered_line_numbers = []
+            self.filtered_line_numbers = array('q')
             self.line_number_to_display_index = {}
         
+        # 显示索引随过滤条件变化，重新换算一次
+        if self.selected_line != -1:
+            self.selected_display_index = self._get_display_index(self.selected_line)
+        
         self.scroll_position = 0
         self._calculate_line_number_width()
         self._calculate_content_dimensions()
@@ -171,8 +342,14 @@ class TextDisplay(QWidget):
     def cleanup_resources(self):
         """清理资源"""
         if self.preload_thread and self.preload_thread.isRunning():
-            self.preload_thread.quit()
+            self.preload_thread.stop()
             self.preload_thread.wait(1000)
+        self.preload_thread = None
+        
+        if self.prefault_thread and self.prefault_thread.isRunning():
+            self.prefault_thread.stop()
+            self.prefault_thread.wait(1000)
+        self.prefault_thread = None
         
         if self.file_mmap:
             self.file_mmap.close()
@@ -187,7 +364,8 @@ class TextDisplay(QWidget):
         self.cleanup_resources()
         
         self.file_path = file_path
-        self.line_offsets = line_offsets
+        # 每个偏移量只占8字节，而不是一个完整的Python int对象
+        self.line_offsets = line_offsets if isinstance(line_offsets, array) else array('q', line_offsets)
         self.total_lines = len(line_offsets) - 1
         
         try:
@@ -197,24 +375,31 @@ class TextDisplay(QWidget):
                 0, 
                 access=mmap.ACCESS_READ
             )
+            _remember_line_offsets(file_path, self.line_offsets)
             
             # 检测文件编码
             self._detect_file_encoding()
             
+            self._start_prefault()
+            
         except Exception as e:
             print(f"文件映射失败: {e}")
             if self.file_handle:
                 self.file_handle.close()
+            self.file_mmap = None
+            self.file_handle = None
             return False
             
-        # 重置状态
+        # 重置状态（包括上一个文件的选中行，避免键盘导航从旧索引开始）
         self.scroll_position = 0
-        self.line_cache.clear()
+        self.selected_line = -1
+        self.selected_display_index = -1
+        self._clear_line_cache()
         self.search_results_manager.clear_results()
         
         # 重置过滤状态
         self.filter_mode = False
-        self.filtered_line_numbers = []
+        self.filtered_line_numbers = array('q')
         self.line_number_to_display_index = {}
 
         self._calculate_line_number_width()
@@ -222,6 +407,31 @@ class TextDisplay(QWidget):
         self.update()
         return True
 
+    def _start_prefault(self):
+        """
+        提示内核按顺序大块预读并提前读入整个文件
+
+        支持 MADV_WILLNEED 时由内核异步预读（已在页缓存中的部分不会重复读盘），
+        否则退回后台线程用 readinto 读一遍；两者都不可用时不做预读
+        """
+        # 预读只是提示，madvise失败不应影响文件加载
+        if hasattr(mmap, 'MADV_SEQUENTIAL'):
+            try:
+                self.file_mmap.madvise(mmap.MADV_SEQUENTIAL)
+                self.madvise_mode = mmap.MADV_SEQUENTIAL
+            except OSError:
+                pass
+        
+        if hasattr(mmap, 'MADV_WILLNEED'):
+            try:
+                self.file_mmap.madvise(mmap.MADV_WILLNEED)
+                return
+            except OSError:
+                pass
+        
+        self.prefault_thread = PrefaultThread(self.file_path)
+        self.prefault_thread.start(QThread.LowPriority)
+
     def _detect_file_encoding(self):
         """
         检测文件编码
@@ -294,7 +504,8 @@ class TextDisplay(QWidget):
             return
             
         if self.filter_mode and self.filtered_line_numbers:
-            max_line_number = max(self.filtered_line_numbers)
+            # 过滤映射已排序，最后一项即最大行号
+            max_line_number = self.filtered_line_numbers[-1]
         else:
             max_line_number = self.total_lines
             
@@ -306,6 +517,19 @@ class TextDisplay(QWidget):
         """计算内容区域尺寸"""
         scrollbar_width = 20 if self._get_effective_total_lines() > self.visible_lines else 0
         self.content_width = max(100, self.width() - self.line_number_width - scrollbar_width - 10)
+        self._update_line_byte_limit()
+
+    def _update_line_byte_limit(self):
+        """根据屏幕上最多能显示的字符数，计算每行最多需要解码的字节数"""
+        chars_per_line = max(10, (self.content_width - 10) // max(1, self.char_width))
+        max_chars = chars_per_line * self.visible_lines if self.wrap_enabled else chars_per_line
+        max_bytes = (max_chars + 16) * 4  # 每个字符最多4字节
+        
+        if max_bytes != self.max_visible_bytes:
+            # 上限变大时，之前被截断的缓存行可能不够长，其余行仍然有效
+            if max_bytes > self.max_visible_bytes:
+                self._invalidate_truncated_lines()
+            self.max_visible_bytes = max_bytes
 
     def _wrap_text(self, text: str) -> List[str]:
         """
@@ -370,7 +594,8 @@ class TextDisplay(QWidget):
             self.hover_line = self.get_line_number_at_position(event.y())
         
         if old_hover != self.hover_line:
-            self.update()
+            self._update_line(old_hover)
+            self._update_line(self.hover_line)
         
         super().mouseMoveEvent(event)
 
@@ -402,6 +627,8 @@ class TextDisplay(QWidget):
     def _update_font_metrics(self):
         """更新字体度量信息"""
         fm = QFontMetrics(self.font)
+        self.font_metrics = fm
+        self.font_fixed_pitch = QFontInfo(self.font).fixedPitch()
         self.line_height = fm.height()
         self.char_width = fm.averageCharWidth()
         self.visible_lines = max(1, self.height() // self.line_height)
@@ -412,10 +639,13 @@ class TextDisplay(QWidget):
         """获取指定行的文本内容（带缓存）- 改进编码处理"""
         if not self.file_mmap or line_number >= self.total_lines:
             return ""
-            
-        with QMutexLocker(self.cache_mutex):
-            if line_number in self.line_cache:
-                return self.line_cache[line_number]
+
+        # 无锁读取：命中后再次校验键，避免与写入线程交错时读到其他行的内容
+        slot = line_number & self.cache_mask
+        if self.cache_keys[slot] == line_number:
+            cached_text = self.cache_vals[slot]
+            if cached_text is not None and self.cache_keys[slot] == line_number:
+                return cached_text
         
         try:
             start_offset = self.line_offsets[line_number]
@@ -423,30 +653,137 @@ class TextDisplay(QWidget):
                          if line_number + 1 < len(self.line_offsets) 
                          else len(self.file_mmap))
             
+            # 超长行只取可能显示出来的部分再解码
+            truncated = end_offset - start_offset > self.max_visible_bytes
+            if truncated:
+                end_offset = start_offset + self.max_visible_bytes
+            
             line_bytes = self.file_mmap[start_offset:end_offset]
             
             # 改进的编码检测和处理
-            line_text = self._decode_line_bytes(line_bytes)
+            if truncated:
+                line_text = self._decode_truncated_bytes(line_bytes)
+            else:
+                line_text = self._decode_line_bytes(line_bytes)
             line_text = line_text.rstrip('\n\r')
             
+            # 直接覆盖槽位中的旧行，无需整理缓存
             with QMutexLocker(self.cache_mutex):
-                if len(self.line_cache) >= self.max_cache_size:
-                    visible_start = max(0, self.scroll_position - 200)
-                    visible_end = min(self.total_lines, self.scroll_position + self.visible_lines + 200)
-                    
-                    new_cache = {}
-                    for line_num, text in self.line_cache.items():
-                        if visible_start <= line_num <= visible_end:
-                            new_cache[line_num] = text
-                    self.line_cache = new_cache
-                
-                self.line_cache[line_number] = line_text
+                self.cache_keys[slot] = -1
+                self.cache_vals[slot] = line_text
+                self.cache_truncated[slot] = truncated
+                self.cache_keys[slot] = line_number
             
             return line_text
             
         except Exception as e:
             return f"[读取错误: {e}]"
 
+    def preload_line_range(self, first_line: int, last_line: int):
+        """
+        批量解码并缓存 [first_line, last_line) 范围内的连续行
+
+        整段字节只切片、解码一次，再按换行符拆分，代替逐行切片和解码；
+        遇到超长行或整段解码失败时退回逐行读取
+        """
+        if not self.file_mmap:
+            return
+        last_line = min(last_line, self.total_lines)
+        if first_line >= last_line:
+            return
+        
+        line_offsets = self.line_offsets
+        max_bytes = self.max_visible_bytes
+        has_long_line = any(line_offsets[n + 1] - line_offsets[n] > max_bytes
+                            for n in range(first_line, last_line))
+        
+        lines = []
+        if not has_long_line:
+            try:
+                block = self.file_mmap[line_offsets[first_line]:line_offsets[last_line]]
+                lines = block.decode(encoding or self.detected_encoding, errors).split('\n')
+            except (UnicodeDecodeError, LookupError, ValueError):
+                lines = []
+        
+        count = last_line - first_line
+        if len(lines) not in (count, count + 1):
+            for line_number in range(first_line, last_line):
+                self.get_line_text(line_number)
+            return
+        
+        mask = self.cache_mask
+        with QMutexLocker(self.cache_mutex):
+            for line_number, line_text in zip(range(first_line, last_line), lines):
+                slot = line_number & mask
+                self.cache_keys[slot] = -1
+                self.cache_vals[slot] = line_text.rstrip('\n\r')
+                self.cache_truncated[slot] = False
+                self.cache_keys[slot] = line_number
+
+    def iter_lines(self, block_lines: int = 4096, encoding: Optional[str] = None, errors: str = 'strict'):
+        """
+        按顺序逐行产出文件的完整文本（不截断、不经过行缓存）
+
+        直接从映射文件按块切片解码，导出等需要遍历全文的操作不必再把整个文件读成字符串
+
+        Args:
+            block_lines: 每次切片解码的行数
+            encoding: 指定解码使用的编码，默认使用检测到的文件编码
+            errors: 解码错误处理方式，同 bytes.decode
+        """
+        if not self.file_mmap:
+            return
+        
+        file_mmap = self.file_mmap
+        line_offsets = self.line_offsets
+        for first_line in range(0, self.total_lines, block_lines):
+            last_line = min(first_line + block_lines, self.total_lines)
+            count = last_line - first_line
+            block = file_mmap[line_offsets[first_line]:line_offsets[last_line]]
+            try:
+                lines = block.decode(encoding or self.detected_encoding, errors).split('\n')
+            except (UnicodeDecodeError, LookupError):
+                lines = []
+            
+            if len(lines) in (count, count + 1):
+                for line_text in lines[:count]:
+                    yield line_text.rstrip('\r')
+            else:
+                # 整块解码失败时逐行尝试多种编码
+                for line_number in range(first_line, last_line):
+                    line_bytes = file_mmap[line_offsets[line_number]:line_offsets[line_number + 1]]
+                    yield self._decode_line_bytes(line_bytes).rstrip('\n\r')
+
+    def _clear_line_cache(self):
+        """清空行缓存"""
+        with QMutexLocker(self.cache_mutex):
+            self.cache_keys = array('q', [-1]) * self.max_cache_size
+            self.cache_vals = [None] * self.max_cache_size
+            self.cache_truncated = bytearray(self.max_cache_size)
+
+    def _invalidate_truncated_lines(self):
+        """只让被截断过的缓存行失效，完整解码的行不受字节上限变化影响"""
+        with QMutexLocker(self.cache_mutex):
+            truncated = self.cache_truncated
+            slot = truncated.find(1)
+            while slot != -1:
+                self.cache_keys[slot] = -1
+                truncated[slot] = False
+                slot = truncated.find(1, slot + 1)
+
+    def _decode_truncated_bytes(self, line_bytes: bytes) -> str:
+        """
+        解码被截断的行字节
+
+        截断点可能落在多字节字符中间，按检测到的编码最多回退3个字节重试
+        """
+        for cut in range(4):
+            try:
+                return line_bytes[:len(line_bytes) - cut].decode(self.detected_encoding)
+            except (UnicodeDecodeError, LookupError):
+                continue
+        return self._decode_line_bytes(line_bytes)
+
     def _decode_line_bytes(self, line_bytes: bytes) -> str:
         """
         智能解码字节数据，支持多种编码格式
@@ -493,11 +830,42 @@ class TextDisplay(QWidget):
         effective_total = self._get_effective_total_lines()
         line_number = max(0, min(line_number, effective_total - self.visible_lines))
         if line_number != self.scroll_position:
+            self._advise_access_pattern(self.scroll_position, line_number)
             self.scroll_position = line_number
             self.scroll_changed.emit(line_number)
             self.start_preload()
             self.update()
     
+    def _advise_access_pattern(self, old_position: int, new_position: int):
+        """
+        根据滚动方式调整内核预读策略
+
+        远距离跳转（如跳到搜索结果）时对目标窗口使用MADV_RANDOM，避免无用的预读；
+        回到相邻滚动时对整个文件恢复MADV_SEQUENTIAL
+        """
+        if not self.file_mmap or not hasattr(mmap, 'MADV_RANDOM'):
+            return
+        
+        try:
+            if abs(new_position - old_position) > 10 * self.visible_lines:
+                last_display = min(new_position + self.visible_lines, self._get_effective_total_lines()) - 1
+                first_line = self._get_actual_line_number(new_position)
+                last_line = self._get_actual_line_number(last_display)
+                if first_line == -1 or last_line == -1:
+                    return
+                
+                start = self.line_offsets[first_line]
+                start -= start % mmap.PAGESIZE  # madvise要求起始地址按页对齐
+                end = self.line_offsets[last_line + 1]
+                if end > start:
+                    self.file_mmap.madvise(mmap.MADV_RANDOM, start, end - start)
+                    self.madvise_mode = mmap.MADV_RANDOM
+            elif self.madvise_mode != mmap.MADV_SEQUENTIAL:
+                self.file_mmap.madvise(mmap.MADV_SEQUENTIAL)
+                self.madvise_mode = mmap.MADV_SEQUENTIAL
+        except (OSError, ValueError):
+            pass
+    
     def scroll_to_search_result(self, result: SearchResult):
         """滚动到搜索结果位置"""
         if self.filter_mode:
@@ -517,34 +885,54 @@ class TextDisplay(QWidget):
         self.scroll_to_search_result(result)
         self.select_line(result.line_number)
     
-    def select_line(self, line_number: int):
-        """选中指定行"""
+    def select_line(self, line_number: int, display_index: int = None):
+        """
+        选中指定行
+
+        Args:
+            line_number: 实际行号
+            display_index: 已知的显示索引，键盘导航时传入以免重复换算
+        """
         if 0 <= line_number < self.total_lines:
+            if display_index is None:
+                display_index = self._get_display_index(line_number)
+            
             old_selected = self.selected_line
             self.selected_line = line_number
+            self.selected_display_index = display_index
             self.line_selected.emit(line_number)
             
-            if self.filter_mode:
-                display_index = self._get_display_index(line_number)
-                if display_index == -1:
-                    return
-                
-                if not (self.scroll_position <= display_index < self.scroll_position + self.visible_lines):
-                    target_scroll = max(0, display_index - self.visible_lines // 2)
-                    self.scroll_to_line(target_scroll)
-                else:
-                    self.update()
+            if display_index == -1:
+                return
+            
+            if not (self.scroll_position <= display_index < self.scroll_position + self.visible_lines):
+                target_scroll = max(0, display_index - self.visible_lines // 2)
+                self.scroll_to_line(target_scroll)
             else:
-                if not (self.scroll_position <= line_number < self.scroll_position + self.visible_lines):
-                    target_scroll = max(0, line_number - self.visible_lines // 2)
-                    self.scroll_to_line(target_scroll)
-                else:
-                    self.update()
+                self._update_line(old_selected)
+                self._update_line(line_number)
+    
+    def _select_display_index(self, display_index: int):
+        """按显示索引选中行"""
+        actual_line = self._get_actual_line_number(display_index)
+        if actual_line != -1:
+            self.select_line(actual_line, display_index)
+    
+    def _update_line(self, line_number: int):
+        """只重绘指定逻辑行所在的区域，找不到该行时整体重绘"""
+        if line_number == -1:
+            return
+        line_rect = self.line_rects.get(line_number)
+        if line_rect is None:
+            self.update()
+        else:
+            self.update(line_rect)
     
     def clear_selection(self):
         """清除行选择"""
         if self.selected_line != -1:
             self.selected_line = -1
+            self.selected_display_index = -1
             self.update()
     
     def get_line_number_at_position(self, y_pos: int) -> int:
@@ -557,38 +945,18 @@ class TextDisplay(QWidget):
         return self._get_actual_line_number(display_index)
     
     def start_preload(self):
-        """启动预加载线程"""
-        if self.preload_thread and self.preload_thread.isRunning():
-            self.preload_thread.quit()
-            self.preload_thread.wait(500)
-            
-        class PreloadThread(QThread):
-            def __init__(self, widget, start_line, count):
-                super().__init__()
-                self.widget = widget
-                self.start_line = start_line
-                self.count = count
-                self.should_stop = False
-                
-            def run(self):
-                for i in range(self.count):
-                    if self.should_stop:
-                        break
-                    display_index = self.start_line + i
-                    actual_line = self.widget._get_actual_line_number(display_index)
-                    if actual_line != -1 and 0 <= actual_line < self.widget.total_lines:
-                        self.widget.get_line_text(actual_line)
-                        
-            def stop(self):
-                self.should_stop = True
-                        
+        """向预加载线程投递当前可见区域附近的行"""
         preload_start = max(0, self.scroll_position - 50)
         effective_total = self._get_effective_total_lines()
         preload_count = min(self.visible_lines + 100, effective_total - preload_start)
         
-        if preload_count > 0:
-            self.preload_thread = PreloadThread(self, preload_start, preload_count)
+        if preload_count <= 0:
+            return
+        
+        if not self.preload_thread:
+            self.preload_thread = PreloadThread(self)
             self.preload_thread.start()
+        self.preload_thread.post(preload_start, preload_count)
     
     def mousePressEvent(self, event):
         """鼠标按下事件"""
@@ -646,8 +1014,9 @@ class TextDisplay(QWidget):
     def leaveEvent(self, event):
         """鼠标离开控件事件"""
         if self.hover_line != -1:
+            old_hover = self.hover_line
             self.hover_line = -1
-            self.update()
+            self._update_line(old_hover)
         
         self.setCursor(Qt.ArrowCursor)
         super().leaveEvent(event)
@@ -661,53 +1030,25 @@ class TextDisplay(QWidget):
         
         if event.key() == Qt.Key_Up:
             if self.selected_line != -1:
-                if self.filter_mode:
-                    display_index = self._get_display_index(self.selected_line)
-                    if display_index > 0:
-                        new_actual = self._get_actual_line_number(display_index - 1)
-                        if new_actual != -1:
-                            self.select_line(new_actual)
-                else:
-                    if self.selected_line > 0:
-                        self.select_line(self.selected_line - 1)
+                if self.selected_display_index > 0:
+                    self._select_display_index(self.selected_display_index - 1)
             elif effective_total > 0:
-                center_display = self.scroll_position + self.visible_lines // 2
-                center_actual = self._get_actual_line_number(center_display)
-                if center_actual != -1:
-                    self.select_line(center_actual)
+                self._select_display_index(self.scroll_position + self.visible_lines // 2)
             event.accept()
             
         elif event.key() == Qt.Key_Down:
             if self.selected_line != -1:
-                if self.filter_mode:
-                    display_index = self._get_display_index(self.selected_line)
-                    if display_index < len(self.filtered_line_numbers) - 1:
-                        new_actual = self._get_actual_line_number(display_index + 1)
-                        if new_actual != -1:
-                            self.select_line(new_actual)
-                else:
-                    if self.selected_line < self.total_lines - 1:
-                        self.select_line(self.selected_line + 1)
+                if self.selected_display_index < effective_total - 1:
+                    self._select_display_index(self.selected_display_index + 1)
             elif effective_total > 0:
-                center_display = self.scroll_position + self.visible_lines // 2
-                center_actual = self._get_actual_line_number(center_display)
-                if center_actual != -1:
-                    self.select_line(center_actual)
+                self._select_display_index(self.scroll_position + self.visible_lines // 2)
             event.accept()
             
         elif event.key() == Qt.Key_PageUp:
             new_scroll = max(0, self.scroll_position - self.visible_lines)
             self.scroll_to_line(new_scroll)
             if self.selected_line != -1:
-                if self.filter_mode:
-                    display_index = self._get_display_index(self.selected_line)
-                    new_display = max(0, display_index - self.visible_lines)
-                    new_actual = self._get_actual_line_number(new_display)
-                    if new_actual != -1:
-                        self.select_line(new_actual)
-                else:
-                    new_selected = max(0, self.selected_line - self.visible_lines)
-                    self.select_line(new_selected)
+                self._select_display_index(max(0, self.selected_display_index - self.visible_lines))
             event.accept()
             
         elif event.key() == Qt.Key_PageDown:
@@ -715,33 +1056,20 @@ class TextDisplay(QWidget):
                            self.scroll_position + self.visible_lines)
             self.scroll_to_line(new_scroll)
             if self.selected_line != -1:
-                if self.filter_mode:
-                    display_index = self._get_display_index(self.selected_line)
-                    new_display = min(len(self.filtered_line_numbers) - 1, 
-                                    display_index + self.visible_lines)
-                    new_actual = self._get_actual_line_number(new_display)
-                    if new_actual != -1:
-                        self.select_line(new_actual)
-                else:
-                    new_selected = min(self.total_lines - 1, 
-                                     self.selected_line + self.visible_lines)
-                    self.select_line(new_selected)
+                self._select_display_index(min(effective_total - 1,
+                                               self.selected_display_index + self.visible_lines))
             event.accept()
             
         elif event.key() == Qt.Key_Home:
             self.scroll_to_line(0)
-            first_actual = self._get_actual_line_number(0)
-            if first_actual != -1:
-                self.select_line(first_actual)
+            self._select_display_index(0)
             event.accept()
             
         elif event.key() == Qt.Key_End:
             effective_total = self._get_effective_total_lines()
             last_index = effective_total - 1
             self.scroll_to_line(max(0, last_index - self.visible_lines + 1))
-            last_actual = self._get_actual_line_number(last_index)
-            if last_actual != -1:
-                self.select_line(last_actual)
+            self._select_display_index(last_index)
             event.accept()
             
         elif event.key() == Qt.Key_Escape:
@@ -779,10 +1107,23 @@ class TextDisplay(QWidget):
             delta = event.angleDelta().y()
             scroll_lines = -delta // 120 * 3
             
-            new_position = self.scroll_position + scroll_lines
-            self.scroll_to_line(new_position)
+            # 同一轮事件循环内的多次滚轮事件合并为一次滚动和重绘
+            if self.pending_scroll is None:
+                self.pending_scroll = self.scroll_position
+                QTimer.singleShot(0, self._apply_pending_scroll)
+            
+            max_scroll = max(0, self._get_effective_total_lines() - self.visible_lines)
+            self.pending_scroll = max(0, min(self.pending_scroll + scroll_lines, max_scroll))
             event.accept()
 
+    def _apply_pending_scroll(self):
+        """执行合并后的滚轮滚动"""
+        if self.pending_scroll is None:
+            return
+        target_line = self.pending_scroll
+        self.pending_scroll = None
+        self.scroll_to_line(target_line)
+
     def zoom_in(self):
         """放大字体"""
         if self.font_size < self.max_font_size:
@@ -804,6 +1145,8 @@ class TextDisplay(QWidget):
         """更新字体大小并重新计算相关参数"""
         self.font.setPointSize(self.font_size)
         self.setFont(self.font)
+        self.line_number_texts.clear()
+        self.content_texts.clear()
         self._update_font_metrics()
         
         old_visible_lines = self.visible_lines
@@ -835,18 +1178,34 @@ class TextDisplay(QWidget):
             painter.setFont(self.font)
             
             # 绘制背景
-            painter.fillRect(self.rect(), QColor(255, 255, 255))
+            painter.fillRect(self.rect(), self.background_color)
             
             # 绘制行号区域背景
-            line_number_rect = QRect(0, 0, self.line_number_width, self.height())
-            painter.fillRect(line_number_rect, self.line_number_bg_color)
+            self._line_number_area_rect.setRect(0, 0, self.line_number_width, self.height())
+            painter.fillRect(self._line_number_area_rect, self.line_number_bg_color)
+            
+            # 获取当前屏幕内搜索结果的列范围，按行号分组，每行只需一次字典查找
+            spans_by_line = self._get_visible_search_spans()
+            current_span = self._get_current_search_span()
             
-            # 获取当前屏幕内的搜索结果
-            visible_search_results = self._get_visible_search_results()
+            # 只重绘失效区域内的行；滚动或整体重绘时重新记录各行区域
+            dirty = event.rect()
+            if self.line_rects_scroll != self.scroll_position or dirty.contains(self.rect()):
+                self.line_rects = {}
+                self.line_rects_scroll = self.scroll_position
+            
+            # 行号、行内容和搜索高亮收集后分批绘制，减少画笔切换和绘制调用
+            line_number_rows = []
+            content_rows = []
+            highlight_rects = []
+            current_highlights = []
             
             # 绘制每一行
             y_offset = 5
             for i in range(self.visible_lines):
+                if y_offset > dirty.bottom():
+                    break
+                    
                 display_index = self.scroll_position + i
                 actual_line_number = self._get_actual_line_number(display_index)
                 
@@ -858,6 +1217,12 @@ class TextDisplay(QWidget):
                 # 检查是否需要换行
                 wrapped_lines = self._wrap_text(line_text)
                 
+                line_rect = QRect(0, y_offset, self.width(), self.line_height * len(wrapped_lines))
+                self.line_rects[actual_line_number] = line_rect
+                if not dirty.intersects(line_rect):
+                    y_offset += line_rect.height()
+                    continue
+                
                 # 绘制这一逻辑行的所有物理行
                 for wrap_index, wrapped_line in enumerate(wrapped_lines):
                     if y_offset + self.line_height > self.height():
@@ -867,16 +1232,19 @@ class TextDisplay(QWidget):
                     if wrap_index == 0:
                         self._draw_line_backgrounds(painter, actual_line_number, y_offset)
                     
-                    # 绘制搜索结果高亮
-                    self._draw_search_highlights(painter, actual_line_number, y_offset, 
-                                                visible_search_results, wrapped_line, wrap_index, len(wrapped_lines))
+                    # 收集搜索结果高亮
+                    line_spans = spans_by_line.get(actual_line_number)
+                    if line_spans:
+                        self._collect_search_highlights(y_offset, actual_line_number, line_spans,
+                                                        wrapped_line, wrap_index, current_span,
+                                                        highlight_rects, current_highlights)
                     
-                    # 绘制行号（只在第一个换行行显示）
+                    # 行号（只在第一个换行行显示）
                     if wrap_index == 0:
-                        self._draw_line_number(painter, actual_line_number, y_offset)
+                        line_number_rows.append((actual_line_number, y_offset))
                     
-                    # 绘制行内容
-                    self._draw_line_content(painter, wrapped_line, y_offset)
+                    # 行内容
+                    content_rows.append((wrapped_line, y_offset))
                     
                     y_offset += self.line_height
                     
@@ -884,8 +1252,12 @@ class TextDisplay(QWidget):
                     if y_offset >= self.height():
                         break
             
+            self._draw_search_highlights(painter, highlight_rects, current_highlights)
+            self._draw_line_numbers(painter, line_number_rows)
+            self._draw_line_contents(painter, content_rows)
+            
             # 绘制分割线（行号区域和内容区域之间）
-            painter.setPen(QColor(200, 200, 200))
+            painter.setPen(self.separator_color)
             painter.drawLine(self.line_number_width - 1, 0, self.line_number_width - 1, self.height())
             
             # 绘制滚动条
@@ -893,7 +1265,7 @@ class TextDisplay(QWidget):
             
             # 绘制焦点边框
             if self.hasFocus():
-                painter.setPen(QPen(QColor(100, 149, 237), 2))
+                painter.setPen(self.focus_pen)
                 painter.drawRect(1, 1, self.width() - 2, self.height() - 2)
 
         finally:
@@ -901,106 +1273,265 @@ class TextDisplay(QWidget):
     
     def _draw_line_backgrounds(self, painter: QPainter, line_number: int, y_offset: int):
         """绘制行背景高亮效果"""
-        content_rect = QRect(self.line_number_width, y_offset, 
-                           self.width() - self.line_number_width, self.line_height)
-        
         if line_number == self.selected_line:
-            painter.fillRect(content_rect, self.selected_line_color)
-            line_num_rect = QRect(0, y_offset, self.line_number_width, self.line_height)
-            painter.fillRect(line_num_rect, self.line_number_selected_color)
-            
+            color = self.selected_line_color
+            self._ln_rect.setRect(0, y_offset, self.line_number_width, self.line_height)
+            painter.fillRect(self._ln_rect, self.line_number_selected_color)
         elif line_number == self.hover_line:
-            painter.fillRect(content_rect, self.hover_line_color)
+            color = self.hover_line_color
+        else:
+            return
+        
+        self._content_rect.setRect(self.line_number_width, y_offset,
+                                   self.width() - self.line_number_width, self.line_height)
+        painter.fillRect(self._content_rect, color)
+    
+    def _draw_line_numbers(self, painter: QPainter, rows: List[Tuple[int, int]]):
+        """批量绘制行号，普通行和选中行各只设置一次画笔"""
+        selected_rows = []
+        painter.setPen(self.line_number_text_color)
+        for line_number, y_offset in rows:
+            if line_number == self.selected_line:
+                selected_rows.append((line_number, y_offset))
+            else:
+                self._draw_line_number(painter, line_number, y_offset)
+        
+        if selected_rows:
+            painter.setPen(self.line_number_selected_text_color)
+            for line_number, y_offset in selected_rows:
+                self._draw_line_number(painter, line_number, y_offset)
     
     def _draw_line_number(self, painter: QPainter, line_number: int, y_offset: int):
-        """绘制行号"""
-        if line_number == self.selected_line:
-            painter.setPen(QColor(255, 255, 255))
-        else:
-            painter.setPen(QColor(100, 100, 100))
-            
-        line_num_text = f"{line_number + 1}"
-        text_rect = QRect(5, y_offset, self.line_number_width - 10, self.line_height)
-        painter.drawText(text_rect, Qt.AlignRight | Qt.AlignVCenter, line_num_text)
+        """绘制行号（右对齐、垂直居中），排版结果缓存复用"""
+        # 直接以行号整数为键，命中时无需再格式化字符串
+        static_text = self.line_number_texts.get(line_number)
+        if static_text is None:
+            if len(self.line_number_texts) >= 4096:
+                self.line_number_texts.clear()
+            static_text = self._make_static_text(str(line_number + 1))
+            self.line_number_texts[line_number] = static_text
+        
+        size = static_text.size()
+        x = self.line_number_width - 5 - size.width()
+        y = y_offset + (self.line_height - size.height()) / 2
+        painter.drawStaticText(QPointF(x, y), static_text)
     
-    def _draw_line_content(self, painter: QPainter, line_text: str, y_offset: int):
-        """绘制行内容文本"""
-        painter.setPen(QColor(0, 0, 0))
+    def _draw_line_contents(self, painter: QPainter, rows: List[Tuple[str, int]]):
+        """批量绘制行内容文本"""
+        painter.setPen(self.text_color)
         content_x = self.line_number_width + 5
         
         # 计算可用宽度
         scrollbar_width = 20 if self._get_effective_total_lines() > self.visible_lines else 0
         available_width = self.width() - content_x - scrollbar_width - 10
         
-        # 绘制文本
-        text_rect = QRect(content_x, y_offset, available_width, self.line_height)
-        painter.drawText(text_rect, Qt.AlignLeft | Qt.AlignVCenter, line_text)
+        # QStaticText不会自行裁剪，超出内容区域的部分由裁剪区域截掉
+        painter.save()
+        self._clip_rect.setRect(content_x, 0, available_width, self.height())
+        painter.setClipRect(self._clip_rect, Qt.IntersectClip)
+        for line_text, y_offset in rows:
+            static_text = self._get_content_static_text(line_text)
+            y = y_offset + (self.line_height - static_text.size().height()) / 2
+            painter.drawStaticText(QPointF(content_x, y), static_text)
+        painter.restore()
+    
+    def _get_content_static_text(self, line_text: str) -> QStaticText:
+        """获取行内容的QStaticText，内容未变的行重绘时无需重新排版"""
+        static_text = self.content_texts.get(line_text)
+        if static_text is not None:
+            self.content_texts.move_to_end(line_text)
+            return static_text
+        
+        static_text = self._make_static_text(line_text)
+        self.content_texts[line_text] = static_text
+        if len(self.content_texts) > self.max_content_texts:
+            self.content_texts.popitem(last=False)
+        return static_text
+    
+    def _make_static_text(self, text: str) -> QStaticText:
+        """创建按当前字体预排版的纯文本QStaticText"""
+        static_text = QStaticText(text)
+        static_text.setTextFormat(Qt.PlainText)
+        static_text.prepare(QTransform(), self.font)
+        return static_text
     
     def _get_visible_search_results(self) -> List[SearchResult]:
         """获取当前可见区域内的搜索结果"""
-        visible_results = []
-        
-        with QMutexLocker(self.search_results_manager.results_mutex):
-            for result in self.search_results_manager.results:
-                if self.filter_mode:
-                    display_index = self._get_display_index(result.line_number)
-                    if (display_index != -1 and 
-                        self.scroll_position <= display_index < self.scroll_position + self.visible_lines):
-                        visible_results.append(result)
-                else:
-                    if (self.scroll_position <= result.line_number < 
-                        self.scroll_position + self.visible_lines):
-                        visible_results.append(result)
-                    
-        return visible_results
+        if not self.filter_mode:
+            # 结果按行号有序，直接二分查找可见行范围
+            return self.search_results_manager.get_results_in_line_range(
+                self.scroll_position, self.scroll_position + self.visible_lines)
+        
+        # 过滤模式：可见的实际行号是 filtered_line_numbers 中连续的一段（有序），
+        # 先按首末实际行号二分取出结果，再剔除落在被过滤掉的行上的结果
+        visible_lines = self.filtered_line_numbers[
+            self.scroll_position:self.scroll_position + self.visible_lines]
+        if not visible_lines:
+            return []
+        
+        candidates = self.search_results_manager.get_results_in_line_range(
+            visible_lines[0], visible_lines[-1] + 1)
+        if not candidates:
+            return []
+        
+        visible_line_set = set(visible_lines)
+        return [result for result in candidates if result.line_number in visible_line_set]
+    
+    def has_visible_results(self, results: List[SearchResult]) -> bool:
+        """判断这些结果中是否有落在当前可见区域内的，用于决定新结果到达时是否需要重绘"""
+        first_index = self.scroll_position
+        last_index = first_index + self.visible_lines
+        for result in results:
+            if first_index <= self._get_display_index(result.line_number) < last_index:
+                return True
+        return False
     
-    def _draw_search_highlights(self, painter: QPainter, line_number: int, 
-                              y_offset: int, visible_results: List[SearchResult],
-                              wrapped_line: str, wrap_index: int, total_wraps: int):
-        """绘制搜索结果高亮 - 支持换行文本"""
+    def _get_visible_search_spans(self) -> Dict[int, List[Tuple[int, int]]]:
+        """
+        获取当前可见区域内搜索结果的 (起始列, 结束列)，按行号分组，组内保持从左到右的顺序
+
+        直接取结果管理器中行号/列号平行数组的切片，绘制时不再逐个访问结果对象的属性
+        """
+        if not self.filter_mode:
+            first_line = self.scroll_position
+            last_line = first_line + self.visible_lines
+            visible_line_set = None
+        else:
+            # 过滤模式：按首末实际行号取出，再剔除落在被过滤掉的行上的结果
+            visible_lines = self.filtered_line_numbers[
+                self.scroll_position:self.scroll_position + self.visible_lines]
+            if not visible_lines:
+                return {}
+            first_line = visible_lines[0]
+            last_line = visible_lines[-1] + 1
+            visible_line_set = set(visible_lines)
+        
+        lines, starts, ends = self.search_results_manager.get_spans_in_line_range(first_line, last_line)
+        spans_by_line = {}
+        for line_number, start, end in zip(lines, starts, ends):
+            if visible_line_set is not None and line_number not in visible_line_set:
+                continue
+            line_spans = spans_by_line.get(line_number)
+            if line_spans is None:
+                spans_by_line[line_number] = [(start, end)]
+            else:
+                line_spans.append((start, end))
+        return spans_by_line
+    
+    def _get_current_search_span(self) -> Optional[Tuple[int, int, int]]:
+        """当前搜索结果的 (行号, 起始列, 结束列)，没有当前结果时为 None"""
+        result = self.current_search_result
+        if result is None:
+            return None
+        return result.line_number, result.column_start, result.column_end
+    
+    def _collect_search_highlights(self, y_offset: int, line_number: int,
+                                   line_spans: List[Tuple[int, int]],
+                                   wrapped_line: str, wrap_index: int,
+                                   current_span: Optional[Tuple[int, int, int]],
+                                   highlight_rects: List[QRect], current_highlights: List[tuple]):
+        """
+        收集一个换行段内的搜索高亮 - 支持换行文本
+
+        普通结果合并成连续的矩形追加到 highlight_rects，当前结果追加到 current_highlights，
+        由 _draw_search_highlights 在整屏收集完后统一绘制
+        """
+        # 空行时没有可高亮的内容
+        if not wrapped_line:
+            return
+        
+        # 这个换行段在原始文本中的起止位置，与具体结果无关，只算一次
+        chars_per_line = max(10, (self.content_width - 10) // self.char_width)
+        wrap_start = wrap_index * chars_per_line
+        wrap_end = wrap_start + len(wrapped_line)
+        
+        # 当前结果在这一行时的列范围
+        current_columns = None
+        if current_span is not None and current_span[0] == line_number:
+            current_columns = current_span[1:]
+        
+        # 收集这一换行段内的高亮列范围（相对于换行段）
+        ranges = []
+        for column_start, column_end in line_spans:
+            # 检查搜索结果是否在当前换行段中
+            if not (column_start < wrap_end and column_end > wrap_start):
+                continue
+            
+            # 计算在当前换行段中的相对位置
+            highlight_start = max(0, column_start - wrap_start)
+            highlight_end = min(len(wrapped_line), column_end - wrap_start)
+            
+            if (column_start, column_end) == current_columns:
+                column_x = self._column_x_function(wrapped_line)
+                start_x = column_x(highlight_start)
+                current_highlights.append((y_offset, start_x, column_x(highlight_end) - start_x,
+                                           wrapped_line[highlight_start:highlight_end]))
+            else:
+                ranges.append((highlight_start, highlight_end))
+        
+        # 重叠或相邻的匹配合并成一个矩形，半透明颜色也不会因重叠而加深
+        column_x = self._column_x_function(wrapped_line)
+        for highlight_start, highlight_end in self._merge_column_ranges(ranges):
+            start_x = column_x(highlight_start)
+            highlight_rects.append(QRect(start_x, y_offset, column_x(highlight_end) - start_x,
+                                         self.line_height))
+    
+    def _column_x_function(self, wrapped_line: str):
+        """
+        返回把换行段内的列号换算成x坐标的函数
+
+        等宽字体下的纯ASCII行直接用整数乘法；否则（比例字体、中文等宽度不一的字符）
+        按实际排版宽度计算前缀的水平advance，高亮才能与绘制出的文本对齐
+        """
         content_x = self.line_number_width + 5
+        if self.font_fixed_pitch and wrapped_line.isascii():
+            char_width = self.char_width
+            return lambda column: content_x + column * char_width
         
-        for result in visible_results:
-            if result.line_number == line_number:
-                # 计算在当前换行中的匹配位置
-                chars_per_line = max(10, (self.content_width - 10) // self.char_width)
-                
-                # 计算这个换行段在原始文本中的起始和结束位置
-                wrap_start = wrap_index * chars_per_line
-                wrap_end = min(wrap_start + chars_per_line, len(result.line_content))
-                
-                # 检查搜索结果是否在当前换行段中
-                if (result.column_start < wrap_end and result.column_end > wrap_start):
-                    # 计算在当前换行段中的相对位置
-                    highlight_start = max(0, result.column_start - wrap_start)
-                    highlight_end = min(len(wrapped_line), result.column_end - wrap_start)
-                    
-                    if highlight_start < highlight_end:
-                        # 计算高亮区域位置
-                        start_x = content_x + highlight_start * self.char_width
-                        width = (highlight_end - highlight_start) * self.char_width
-                        
-                        # 选择高亮颜色
-                        if result == self.current_search_result:
-                            color = self.current_search_color
-                            highlight_rect = QRect(start_x - 1, y_offset - 1, width + 2, self.line_height + 2)
-                            painter.setPen(QPen(QColor(255, 140, 0), 2))
-                            painter.drawRect(highlight_rect)
-                        else:
-                            color = self.search_highlight_color
-                        
-                        # 绘制搜索结果背景高亮
-                        highlight_rect = QRect(start_x, y_offset, width, self.line_height)
-                        painter.fillRect(highlight_rect, color)
-                        
-                        # 重新绘制高亮区域的文本
-                        if result == self.current_search_result:
-                            painter.setPen(QColor(139, 69, 19))
-                        else:
-                            painter.setPen(QColor(0, 0, 0))
-                            
-                        highlighted_text = wrapped_line[highlight_start:highlight_end]
-                        painter.drawText(start_x, y_offset + self.line_height - 5, highlighted_text)
+        advance = self.font_metrics.horizontalAdvance
+        return lambda column: content_x + advance(wrapped_line, column)
+    
+    @staticmethod
+    def _merge_column_ranges(ranges: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+        """合并重叠或相邻的 [start, end) 列范围"""
+        if len(ranges) < 2:
+            return ranges
+        
+        ranges.sort()
+        merged = [ranges[0]]
+        for start, end in ranges[1:]:
+            last_start, last_end = merged[-1]
+            if start <= last_end:
+                if end > last_end:
+                    merged[-1] = (last_start, end)
+            else:
+                merged.append((start, end))
+        return merged
+    
+    def _draw_search_highlights(self, painter: QPainter, highlight_rects: List[QRect],
+                                current_highlights: List[tuple]):
+        """
+        绘制整屏的搜索高亮
+
+        普通结果的背景一次 drawRects 画完，其文本由随后的行内容绘制覆盖，无需重画；
+        当前结果最后绘制，保证边框和颜色在最上层
+        """
+        if highlight_rects:
+            painter.setPen(Qt.NoPen)
+            painter.setBrush(self.search_highlight_color)
+            painter.drawRects(highlight_rects)
+            painter.setBrush(Qt.NoBrush)
+        
+        for y_offset, start_x, width, highlighted_text in current_highlights:
+            self._highlight_rect.setRect(start_x - 1, y_offset - 1, width + 2, self.line_height + 2)
+            painter.setPen(self.current_search_pen)
+            painter.drawRect(self._highlight_rect)
+            
+            # 绘制当前结果背景高亮并用醒目颜色重新绘制文本
+            self._highlight_rect.setRect(start_x, y_offset, width, self.line_height)
+            painter.fillRect(self._highlight_rect, self.current_search_color)
+            painter.setPen(self.current_search_text_color)
+            painter.drawText(start_x, y_offset + self.line_height - 5, highlighted_text)
     
     def _draw_interactive_scrollbar(self, painter: QPainter):
         """绘制交互式滚动条"""
@@ -1013,18 +1544,18 @@ class TextDisplay(QWidget):
         self.scrollbar_thumb_rect = thumb_rect
         
         # 绘制滚动条背景
-        painter.fillRect(scrollbar_rect, QColor(240, 240, 240))
-        painter.setPen(QColor(200, 200, 200))
+        painter.fillRect(scrollbar_rect, self.scrollbar_bg_color)
+        painter.setPen(self.scrollbar_border_color)
         painter.drawRect(scrollbar_rect)
         
         # 绘制滚动条滑块
         if self.scrollbar_dragging:
-            thumb_color = QColor(80, 80, 80, 200)
+            thumb_color = self.scrollbar_thumb_dragging_color
         else:
-            thumb_color = QColor(150, 150, 150, 160)
+            thumb_color = self.scrollbar_thumb_color
             
         painter.fillRect(thumb_rect, thumb_color)
-        painter.setPen(QColor(100, 100, 100))
+        painter.setPen(self.scrollbar_thumb_border_color)
         painter.drawRect(thumb_rect)
 
     def get_search_res(self) -> tuple[int, str, str]:
@@ -1039,6 +1570,24 @@ class TextDisplay(QWidget):
         
         return results_count, pattern, description
 
+    def clear_search_state(self, reset_filter: bool = True):
+        """
+        一次性清除搜索结果、当前结果和过滤状态，只触发一次重绘
+
+        Args:
+            reset_filter: 是否同时退出过滤模式；本来就不在过滤模式时不会重置滚动位置
+        """
+        self.search_results_manager.clear_results()
+        self.current_search_result = None
+        
+        if reset_filter and self.filter_mode:
+            # 选中行的显示索引是按过滤视图计算的，退出过滤时一并清除选择
+            self.selected_line = -1
+            self.selected_display_index = -1
+            self.set_filter_mode(False)  # 内部已调用update()
+        else:
+            self.update()
+
     def clear_filtered_display(self):
         """清除过滤显示，回到正常模式"""
         self.set_filter_mode(False)
@@ -1066,7 +1615,7 @@ class TextDisplay(QWidget):
             print(f"手动设置编码为: {encoding}")
             
             # 清除缓存，强制重新解码
-            self.line_cache.clear()
+            self._clear_line_cache()
             self.update()
             
         except (UnicodeDecodeError, LookupError):
@@ -1079,19 +1628,12 @@ class TextDisplay(QWidget):
     def toggle_text_wrap(self):
         """切换文本换行模式"""
         self.wrap_enabled = not self.wrap_enabled
+        self._update_line_byte_limit()
         self.update()
 
     def set_text_wrap(self, enabled: bool):
         """设置文本换行模式"""
         if self.wrap_enabled != enabled:
             self.wrap_enabled = enabled
-            self.update()
-        """切换文本换行模式"""
-        self.wrap_enabled = not self.wrap_enabled
-        self.update()
-
-    def set_text_wrap(self, enabled: bool):
-        """设置文本换行模式"""
-        if self.wrap_enabled != enabled:
-            self.wrap_enabled = enabled
+            self._update_line_byte_limit()
             self.update()
\ No newline at end of file
@@ -1,28 +1,244 @@
 from PyQt5.QtWidgets import (
-    QTableWidget, QAbstractItemView, QTableWidgetItem, QCheckBox,
-    QWidget, QHBoxLayout, QHeaderView, QInputDialog
+    QTableView, QAbstractItemView, QHeaderView, QInputDialog, QApplication,
+    QStyledItemDelegate, QStyle, QStyleOptionButton, QStyleOptionViewItem, QMenu
 )
-from PyQt5.QtCore import Qt, pyqtSignal
+from PyQt5.QtCore import (
+    Qt, pyqtSignal, QObject, QRunnable, QThreadPool, QAbstractTableModel, QModelIndex, QEvent
+)
+from functools import lru_cache
 import re
 
-class SearchTable(QTableWidget):
+from dataform.search_row import SearchRow
+
+
+@lru_cache(maxsize=256)
+def _compile(pattern: str, flags: int = 0) -> re.Pattern:
+    """编译用户输入的正则并缓存，重复输入同一个表达式时不再重新编译"""
+    return re.compile(pattern, flags)
+
+
+class HitCountSignals(QObject):
+    """匹配计数任务的信号（QRunnable本身不能发信号）"""
+    
+    finished = pyqtSignal(str, int)  # 正则表达式, 匹配数
+    error = pyqtSignal(str)          # 错误信息
+
+
+class HitCountJob(QRunnable):
+    """匹配计数任务 - 在线程池中统计正则在编辑器全文中的匹配次数"""
+    
+    def __init__(self, pattern: str, regex: re.Pattern, editor):
+        super().__init__()
+        self.signals = HitCountSignals()
+        self.pattern = pattern
+        self.regex = regex
+        self.editor = editor
+    
+    def run(self):
+        # 从编辑器的映射文件逐行取出文本逐行匹配，与搜索引擎按行匹配的语义一致，
+        # 内存中只保留当前一块行
+        finditer = self.regex.finditer
+        try:
+            hit_count = sum(1 for line in self.editor.iter_lines() for _ in finditer(line))
+        except (ValueError, OSError) as e:  # 标签页已关闭、映射已释放
+            print(f"统计匹配数失败: {e}")
+            self.signals.error.emit(f"统计匹配数失败: {e}")
+            return
+        self.signals.finished.emit(self.pattern, hit_count)
+
+
+class SearchModel(QAbstractTableModel):
+    """
+    搜索表格的数据模型 - 每行是一个 SearchRow
+
+    勾选列通过 Qt.CheckStateRole 提供，视图只查询可见行，不再为每行创建控件
+    """
+    
+    HEADERS = ["✔", "Pattern", "Description", "Hits"]
+    CHECKED, PATTERN, DESCRIPTION, HITS = range(4)  # 列号
+    
+    # 某一行的勾选状态被用户改变：行号, 是否勾选
+    checkbox_changed = pyqtSignal(int, bool)
+    
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.rows: list[SearchRow] = []
+    
+    def rowCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self.rows)
+    
+    def columnCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self.HEADERS)
+    
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.HEADERS[section]
+        return super().headerData(section, orientation, role)
+    
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        
+        row = self.rows[index.row()]
+        column = index.column()
+        if column == self.CHECKED:
+            if role == Qt.CheckStateRole:
+                return Qt.Checked if row.checked else Qt.Unchecked
+            return None
+        
+        if role == Qt.DisplayRole:
+            if column == self.PATTERN:
+                return row.pattern
+            if column == self.DESCRIPTION:
+                return row.description
+            return str(row.hits)
+        return None
+    
+    def flags(self, index):
+        if not index.isValid():
+            return Qt.NoItemFlags
+        if index.column() == self.CHECKED:
+            return Qt.ItemIsEnabled | Qt.ItemIsSelectable | Qt.ItemIsUserCheckable
+        return Qt.ItemIsEnabled | Qt.ItemIsSelectable
+    
+    def setData(self, index, value, role=Qt.EditRole) -> bool:
+        if not index.isValid() or index.column() != self.CHECKED or role != Qt.CheckStateRole:
+            return False
+        
+        checked = value == Qt.Checked
+        row = self.rows[index.row()]
+        if row.checked != checked:
+            row.checked = checked
+            self.dataChanged.emit(index, index, [Qt.CheckStateRole])
+            self.checkbox_changed.emit(index.row(), checked)
+        return True
+    
+    def add_row(self, search_row: SearchRow) -> int:
+        """在末尾追加一行，返回行号"""
+        row = len(self.rows)
+        self.beginInsertRows(QModelIndex(), row, row)
+        self.rows.append(search_row)
+        self.endInsertRows()
+        return row
+    
+    def set_all_checked(self, checked: bool) -> bool:
+        """
+        一次性设置所有行的勾选状态，只发一次 dataChanged
+
+        Returns:
+            是否有行的状态真正发生了变化
+        """
+        changed = False
+        for row in self.rows:
+            if row.checked != checked:
+                row.checked = checked
+                changed = True
+        
+        if changed:
+            self.dataChanged.emit(self.index(0, self.CHECKED),
+                                  self.index(len(self.rows) - 1, self.CHECKED),
+                                  [Qt.CheckStateRole])
+        return changed
+    
+    def pattern_column_changed(self, first_row: int = 0, last_row: int = -1):
+        """表达式列 [first_row, last_row] 的内容被更新后通知视图，last_row 为 -1 时到最后一行"""
+        if last_row < 0:
+            last_row = len(self.rows) - 1
+        if first_row <= last_row:
+            self.dataChanged.emit(self.index(first_row, self.PATTERN),
+                                  self.index(last_row, self.PATTERN),
+                                  [Qt.DisplayRole])
+    
+    def clear(self):
+        """清空所有行"""
+        self.beginResetModel()
+        self.rows = []
+        self.endResetModel()
+
+
+class CheckBoxDelegate(QStyledItemDelegate):
+    """
+    勾选列的委托 - 在单元格中央直接画出原生的复选框指示器
+
+    不创建任何控件，点击或按空格时把切换后的状态通过 setData 写回模型
+    """
+    
+    def _style(self, option):
+        return option.widget.style() if option.widget else QApplication.style()
+    
+    def _check_rect(self, option):
+        """复选框指示器在单元格中居中后的区域"""
+        style = self._style(option)
+        indicator = style.subElementRect(QStyle.SE_CheckBoxIndicator, QStyleOptionButton(), option.widget)
+        return QStyle.alignedRect(option.direction, Qt.AlignCenter, indicator.size(), option.rect)
+    
+    def paint(self, painter, option, index):
+        # 先按普通单元格画出背景和选中高亮，但不画默认位置的复选框
+        item_option = QStyleOptionViewItem(option)
+        self.initStyleOption(item_option, index)
+        item_option.features &= ~QStyleOptionViewItem.HasCheckIndicator
+        style = self._style(option)
+        style.drawControl(QStyle.CE_ItemViewItem, item_option, painter, option.widget)
+        
+        check_option = QStyleOptionButton()
+        check_option.rect = self._check_rect(option)
+        check_option.state = QStyle.State_Enabled
+        check_option.state |= QStyle.State_On if index.data(Qt.CheckStateRole) == Qt.Checked else QStyle.State_Off
+        style.drawPrimitive(QStyle.PE_IndicatorCheckBox, check_option, painter, option.widget)
+    
+    def editorEvent(self, event, model, option, index):
+        if not index.flags() & Qt.ItemIsUserCheckable:
+            return False
+        
+        event_type = event.type()
+        if event_type in (QEvent.MouseButtonPress, QEvent.MouseButtonRelease, QEvent.MouseButtonDblClick):
+            if event.button() != Qt.LeftButton or not self._check_rect(option).contains(event.pos()):
+                return False
+            # 按下和双击只吞掉事件，松开时才切换
+            if event_type != QEvent.MouseButtonRelease:
+                return True
+        elif event_type == QEvent.KeyPress:
+            if event.key() not in (Qt.Key_Space, Qt.Key_Select):
+                return False
+        else:
+            return False
+        
+        checked = index.data(Qt.CheckStateRole) == Qt.Checked
+        return model.setData(index, Qt.Unchecked if checked else Qt.Checked, Qt.CheckStateRole)
+
+
+class SearchTable(QTableView):
     """
     优化的搜索表格 - 支持复选框状态变化信号
     """
     
     # 新增信号：当复选框状态变化时发出
     checkbox_changed = pyqtSignal()
+    # 用户从右键菜单请求添加正则条目，由主窗口提供当前编辑器
+    regex_entry_requested = pyqtSignal()
     
     def __init__(self):
         super().__init__()
-        self.setColumnCount(4)
-        self.setHorizontalHeaderLabels(["✔", "Pattern", "Description", "Hits"])
+        self.search_model = SearchModel(self)
+        self.setModel(self.search_model)
+        self.setItemDelegateForColumn(SearchModel.CHECKED, CheckBoxDelegate(self))
+        self.search_model.checkbox_changed.connect(self._on_checkbox_changed)
 
         self.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
         self.setEditTriggers(QAbstractItemView.NoEditTriggers)
         self.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.setContextMenuPolicy(Qt.CustomContextMenu)
+        self.customContextMenuRequested.connect(self._show_context_menu)
+        self._hit_count_signals = set()  # 进行中的匹配计数任务，保持信号对象存活
+
+    def _show_context_menu(self, pos):
+        """右键菜单"""
+        menu = QMenu(self)
+        menu.addAction("添加正则条目...", lambda: self.regex_entry_requested.emit())
+        menu.exec_(self.viewport().mapToGlobal(pos))
 
-    def table_add_row(self, hit_count: int, include_keywords: list[str], exclude_keywords: list[str], description: str = ""):
+    def table_add_row(self, hit_count: int, include_keywords: list[str], exclude_keywords: list[str],
+                      description: str = "", is_regex: bool = False):
         """
         添加搜索结果行
         
@@ -31,44 +247,41 @@ class SearchTable(QTableWidget):
             include_keywords: 包含关键词列表
             exclude_keywords: 排除关键词列表
             description: 额外描述
+            is_regex: 关键词是否为正则表达式
         """
-        row = self.rowCount()
-        self.insertRow(row)
-
-        pattern_str = self._format_expression(include_keywords, exclude_keywords)
+        pattern_str = self._format_expression(include_keywords, exclude_keywords, is_regex)
         desc_str = self._format_description(include_keywords, exclude_keywords)
 
-        self._add_checkbox(row)
-        self._add_item(row, 1, pattern_str)
-        self._add_item(row, 2, desc_str)
-        self._add_item(row, 3, str(hit_count), editable=False)
+        row = self.search_model.add_row(SearchRow(
+            include_keywords=list(include_keywords),
+            exclude_keywords=list(exclude_keywords),
+            hits=hit_count,
+            pattern=pattern_str,
+            description=desc_str,
+            cached_pattern=pattern_str,
+            is_regex=is_regex,
+        ))
         self.resizeRowToContents(row)
 
-    def _format_expression(self, include_keywords: list[str], exclude_keywords: list[str]) -> str:
+    def _format_expression(self, include_keywords: list[str], exclude_keywords: list[str],
+                           is_regex: bool = False) -> str:
         """
         格式化搜索表达式显示 - 修复逻辑显示
         
-        只显示被勾选的条件，使用正确的逻辑表示
+        只显示被勾选的条件，使用正确的逻辑表示；普通关键词用 '' 括起，正则用 // 括起
         """
         parts = []
+        q = "/" if is_regex else "'"
         
         if include_keywords:
-            if len(include_keywords) == 1:
-                include_expr = f"'{include_keywords[0]}'"
-            else:
-                # 多个包含词使用 AND 逻辑
-                include_expr = " & ".join(f"'{kw}'" for kw in include_keywords)
-                include_expr = f"({include_expr})"
-            parts.append(include_expr)
+            # 多个包含词使用 AND 逻辑；一次 join 拼出所有带引号的关键词
+            quoted = f"{q} & {q}".join(include_keywords)
+            parts.append(f"{q}{quoted}{q}" if len(include_keywords) == 1 else f"({q}{quoted}{q})")
         
         if exclude_keywords:
-            if len(exclude_keywords) == 1:
-                exclude_expr = f"!'{exclude_keywords[0]}'"
-            else:
-                # 多个排除词使用 OR 逻辑（任一匹配就排除）
-                exclude_expr = " | ".join(f"'{kw}'" for kw in exclude_keywords)
-                exclude_expr = f"!({exclude_expr})"
-            parts.append(exclude_expr)
+            # 多个排除词使用 OR 逻辑（任一匹配就排除）
+            quoted = f"{q} | {q}".join(exclude_keywords)
+            parts.append(f"!{q}{quoted}{q}" if len(exclude_keywords) == 1 else f"!({q}{quoted}{q})")
         
         return " & ".join(parts) if parts else "无条件"
 
@@ -78,87 +291,42 @@ class SearchTable(QTableWidget):
         exclude_desc = ", ".join(exclude_keywords) if exclude_keywords else "无"
         return f"包含：{include_desc}\n排除：{exclude_desc}"
 
-    def _add_checkbox(self, row: int):
-        """添加复选框到指定行"""
-        widget = QWidget()
-        checkbox = QCheckBox()
-        checkbox.setCheckState(Qt.Checked)
-        layout = QHBoxLayout(widget)
-        layout.addWidget(checkbox)
-        layout.setAlignment(Qt.AlignCenter)
-        layout.setContentsMargins(0, 0, 0, 0)
-        widget.setLayout(layout)
-        widget.checkbox = checkbox
-        self.setCellWidget(row, 0, widget)
-        
-        # 连接复选框状态变化信号
-        checkbox.stateChanged.connect(lambda state, r=row: self._on_checkbox_changed(r, state))
-
-    def _add_item(self, row: int, col: int, text: str, editable=True):
-        """添加表格项"""
-        item = QTableWidgetItem(text)
-        if not editable:
-            item.setFlags(Qt.ItemIsEnabled)
-        self.setItem(row, col, item)
-
-    def _on_checkbox_changed(self, row: int, state: int):
+    def _on_checkbox_changed(self, row: int, checked: bool):
         """
         复选框状态变化处理
         
         Args:
             row: 行号
-            state: 复选框状态
+            checked: 是否勾选
         """
-        checked = state == Qt.Checked
         print(f"行 {row} 的选择状态变为: {'选中' if checked else '未选中'}")
         
         # 发出信号通知状态变化
         self.checkbox_changed.emit()
         
-        # 更新表达式显示
-        self._update_pattern_display()
+        # 其他行的表达式只取决于它们自己的勾选状态，只需更新这一行
+        self._update_row_pattern(self.search_model.rows[row])
+        self.search_model.pattern_column_changed(row, row)
 
     def _update_pattern_display(self):
         """
         更新所有行的表达式显示，只显示被勾选的条件
         """
-        for row in range(self.rowCount()):
-            checkbox_widget = self.cellWidget(row, 0)
-            if checkbox_widget and hasattr(checkbox_widget, 'checkbox'):
-                is_checked = checkbox_widget.checkbox.isChecked()
-                
-                # 获取原始描述信息
-                desc_item = self.item(row, 2)
-                if desc_item:
-                    desc_text = desc_item.text()
-                    
-                    # 解析包含和排除关键词
-                    include_keywords = []
-                    exclude_keywords = []
-                    
-                    include_match = re.search(r"包含：(.*?)\n", desc_text)
-                    exclude_match = re.search(r"排除：(.*)", desc_text)
-                    
-                    if include_match:
-                        include_text = include_match.group(1).strip()
-                        if include_text and include_text != "无":
-                            include_keywords = [kw.strip() for kw in include_text.split(',')]
-                    
-                    if exclude_match:
-                        exclude_text = exclude_match.group(1).strip()
-                        if exclude_text and exclude_text != "无":
-                            exclude_keywords = [kw.strip() for kw in exclude_text.split(',')]
-                    
-                    # 根据勾选状态更新表达式
-                    if is_checked:
-                        pattern_str = self._format_expression(include_keywords, exclude_keywords)
-                    else:
-                        pattern_str = "[未选中]"
-                    
-                    # 更新表达式列
-                    pattern_item = self.item(row, 1)
-                    if pattern_item:
-                        pattern_item.setText(pattern_str)
+        model = self.search_model
+        for row in model.rows:
+            self._update_row_pattern(row)
+        
+        model.pattern_column_changed()
+
+    def _update_row_pattern(self, row: SearchRow):
+        """直接使用行上保存的关键词列表，根据勾选状态更新表达式列"""
+        if row.checked:
+            if row.cached_pattern is None:
+                row.cached_pattern = self._format_expression(row.include_keywords, row.exclude_keywords,
+                                                             row.is_regex)
+            row.pattern = row.cached_pattern
+        else:
+            row.pattern = "[未选中]"
 
     def get_checked_rows_data(self) -> list[dict]:
         """
@@ -169,75 +337,59 @@ class SearchTable(QTableWidget):
         """
         checked_rows = []
         
-        for row in range(self.rowCount()):
-            checkbox_widget = self.cellWidget(row, 0)
-            if checkbox_widget and hasattr(checkbox_widget, 'checkbox') and checkbox_widget.checkbox.isChecked():
-                # 获取行数据
-                pattern_item = self.item(row, 1)
-                desc_item = self.item(row, 2)
-                hits_item = self.item(row, 3)
-                
-                row_data = {
-                    'pattern': pattern_item.text() if pattern_item else "",
-                    'description': desc_item.text() if desc_item else "",
-                    'hits': hits_item.text() if hits_item else "0"
-                }
-                
-                # 解析关键词
-                if desc_item:
-                    desc_text = desc_item.text()
-                    include_keywords = []
-                    exclude_keywords = []
-                    
-                    include_match = re.search(r"包含：(.*?)\n", desc_text)
-                    exclude_match = re.search(r"排除：(.*)", desc_text)
-                    
-                    if include_match:
-                        include_text = include_match.group(1).strip()
-                        if include_text and include_text != "无":
-                            include_keywords = [kw.strip() for kw in include_text.split(',')]
-                    
-                    if exclude_match:
-                        exclude_text = exclude_match.group(1).strip()
-                        if exclude_text and exclude_text != "无":
-                            exclude_keywords = [kw.strip() for kw in exclude_text.split(',')]
-                    
-                    row_data['include_keywords'] = include_keywords
-                    row_data['exclude_keywords'] = exclude_keywords
-                
-                checked_rows.append(row_data)
+        for row in self.search_model.rows:
+            if row.checked:
+                checked_rows.append({
+                    'pattern': row.pattern,
+                    'description': row.description,
+                    'hits': str(row.hits),
+                    'include_keywords': list(row.include_keywords),
+                    'exclude_keywords': list(row.exclude_keywords),
+                    'is_regex': row.is_regex
+                })
         
         return checked_rows
 
     def clear_table(self):
         """清空表格"""
-        self.setRowCount(0)
+        self.search_model.clear()
 
-    def add_regex_entry_from_user(self, parent, editor):
+    def add_regex_entry_from_user(self, parent, editor, ignore_case: bool = False):
         """
         从用户输入添加正则表达式条目
         
         Args:
             parent: 父窗口
             editor: 文本编辑器实例
+            ignore_case: 是否忽略大小写，与正则搜索保持一致
         """
         pattern, ok = QInputDialog.getText(parent, "正则输入", "请输入正则表达式：")
         if not ok or not pattern.strip():
             return
 
         try:
-            regex = re.compile(pattern)
+            regex = _compile(pattern, re.IGNORECASE if ignore_case else 0)
         except re.error as e:
             print(f"正则表达式错误: {e}")
             return
 
-        # 这里需要根据实际的编辑器接口来获取文本内容
-        # 由于TextDisplay没有toPlainText方法，需要另想办法
-        # 暂时跳过实际匹配，直接添加条目
+        # 全文计数放到线程池，结果回来后再添加条目，不阻塞界面
+        job = HitCountJob(pattern, regex, editor)
+        job.signals.finished.connect(self._on_hit_count_finished)
+        job.signals.error.connect(self._on_hit_count_error)
+        self._hit_count_signals.add(job.signals)
+        QThreadPool.globalInstance().start(job)
 
         return pattern
-        
-        
+
+    def _on_hit_count_finished(self, pattern: str, hit_count: int):
+        """匹配计数完成后添加正则条目"""
+        self._hit_count_signals.discard(self.sender())
+        self.table_add_row(hit_count, [pattern], [], is_regex=True)
+
+    def _on_hit_count_error(self, error_msg: str):
+        """匹配计数失败"""
+        self._hit_count_signals.discard(self.sender())
 
     def set_all_checked(self, checked: bool):
         """
@@ -246,16 +398,11 @@ class SearchTable(QTableWidget):
         Args:
             checked: True为全选，False为全不选
         """
-        for row in range(self.rowCount()):
-            checkbox_widget = self.cellWidget(row, 0)
-            if checkbox_widget and hasattr(checkbox_widget, 'checkbox'):
-                checkbox_widget.checkbox.setChecked(checked)
+        # 整体更新后只通知一次、只刷新一次表达式，而不是每行各触发一遍
+        if self.search_model.set_all_checked(checked):
+            self.checkbox_changed.emit()
+            self._update_pattern_display()
 
     def get_checked_count(self) -> int:
         """获取被勾选的行数"""
-        count = 0
-        for row in range(self.rowCount()):
-            checkbox_widget = self.cellWidget(row, 0)
-            if checkbox_widget and hasattr(checkbox_widget, 'checkbox') and checkbox_widget.checkbox.isChecked():
-                count += 1
-        return count
\ No newline at end of file
+        return sum(row.checked for row in self.search_model.rows)
\ No newline at end of file